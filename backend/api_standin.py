@@ -0,0 +1,181 @@
+"""
+Enregistrement et rejeu des réponses de l'API football, hors réseau
+
+FixtureRecorder capture de vraies réponses "fixtures" (une par fichier JSON,
+nommé par la clé de cache de la requête). StandInServer les rejoue sur un
+serveur HTTP local avec une latence, un taux d'erreurs 5xx et un taux de 429
+configurables et reproductibles (graine). Il suffit de passer son url comme
+base_url à EfficientDataManager pour mesurer récupération, cache et limiteur
+sans consommer de quota.
+"""
+
+import glob
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from response_cache import cache_key
+
+RECORDINGS_DIR = "data/api_recordings"
+BASE_PATH = "/v3"
+
+def recording_key(endpoint, params=None):
+    """Clé d'un enregistrement: paramètres en chaînes, comme dans une query string"""
+    return cache_key(endpoint, {name: str(value) for name, value in (params or {}).items()})
+
+class FixtureRecorder:
+    def __init__(self, transport, recordings_dir=RECORDINGS_DIR):
+        self.transport = transport  # ApiTransport configuré pour la vraie API
+        self.recordings_dir = recordings_dir
+        os.makedirs(recordings_dir, exist_ok=True)
+
+    def record(self, endpoint, params=None):
+        """Appelle l'API (sans cache) et enregistre la réponse; retourne le JSON"""
+        data = self.transport.get(endpoint, params)
+        save_recording(self.recordings_dir, endpoint, params, data)
+        return data
+
+    def record_date(self, date):
+        """Enregistre tous les matchs d'une date, pages suivantes comprises; retourne le nombre de pages"""
+        first_page = self.record("fixtures", {"date": date})
+        total_pages = (first_page.get("paging") or {}).get("total", 1) or 1
+        for page in range(2, total_pages + 1):
+            self.record("fixtures", {"date": date, "page": page})
+        return total_pages
+
+def save_recording(recordings_dir, endpoint, params, data):
+    os.makedirs(recordings_dir, exist_ok=True)
+    path = os.path.join(recordings_dir, f"{recording_key(endpoint, params)}.json")
+    with open(path, "w") as f:
+        json.dump({"endpoint": endpoint, "params": params or {}, "response": data}, f)
+    return path
+
+def load_recordings(recordings_dir=RECORDINGS_DIR):
+    """{clé: réponse JSON} pour tous les enregistrements du dossier"""
+    recordings = {}
+    for path in glob.glob(os.path.join(recordings_dir, "*.json")):
+        with open(path, "r") as f:
+            recording = json.load(f)
+        recordings[recording_key(recording["endpoint"], recording["params"])] = recording["response"]
+    return recordings
+
+def synthetic_fixtures(date, n_leagues=50, fixtures_per_league=5, page_size=100):
+    """Réponses "fixtures" synthétiques d'une date, découpées en pages: {clé: réponse}"""
+    fixtures = [
+        {
+            "fixture": {"id": league_id * 1000 + i, "date": f"{date}T15:00:00+00:00", "status": {"short": "NS"}},
+            "league": {"id": league_id, "name": f"League {league_id}"},
+            "teams": {"home": {"name": f"Home {league_id}-{i}"}, "away": {"name": f"Away {league_id}-{i}"}},
+            "goals": {"home": None, "away": None},
+        }
+        for league_id in range(1, n_leagues + 1)
+        for i in range(fixtures_per_league)
+    ]
+    total_pages = max(1, -(-len(fixtures) // page_size))
+    recordings = {}
+    for page in range(1, total_pages + 1):
+        params = {"date": date} if page == 1 else {"date": date, "page": page}
+        recordings[recording_key("fixtures", params)] = {
+            "errors": [],
+            "results": len(fixtures[(page - 1) * page_size:page * page_size]),
+            "paging": {"current": page, "total": total_pages},
+            "response": fixtures[(page - 1) * page_size:page * page_size],
+        }
+    return recordings
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, comme le fournisseur
+    # En-têtes et corps partent en deux écritures: sans TCP_NODELAY, Nagle + ACK retardé
+    # ajoutent ~40 ms à chaque requête sur une connexion réutilisée
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.standin
+        url = urlparse(self.path)
+        endpoint = url.path[len(BASE_PATH):] if url.path.startswith(BASE_PATH) else url.path
+        params = dict(parse_qsl(url.query))
+        status, headers, payload = server.respond(endpoint.strip("/"), params)
+
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class StandInServer:
+    """Serveur local qui rejoue des enregistrements; url à passer comme base_url"""
+
+    def __init__(self, recordings, latency=0.05, latency_jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1, seed=0, host="127.0.0.1", port=0):
+        self.recordings = recordings
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "missing": 0}
+
+        self.httpd = ThreadingHTTPServer((host, port), _StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    def respond(self, endpoint, params):
+        """(statut, en-têtes, JSON) pour une requête; tirages aléatoires reproductibles"""
+        with self._lock:
+            self.counters["requests"] += 1
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.latency_jitter, self.latency_jitter))
+        time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            self._count("throttled")
+            return 429, {"Retry-After": str(self.retry_after)}, {"message": "Too many requests"}
+        if roll < self.throttle_rate + self.error_rate:
+            self._count("errors")
+            return 503, {}, {"message": "Service unavailable"}
+
+        data = self.recordings.get(recording_key(endpoint, params))
+        if data is None:
+            # Requête non enregistrée: réponse vide, comme une date sans match
+            self._count("missing")
+            data = {"errors": [], "results": 0, "paging": {"current": 1, "total": 1}, "response": []}
+        else:
+            self._count("ok")
+        return 200, {}, data
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="api-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,131 @@
+"""
+Couche HTTP de l'API football: session persistante, timeouts, retries
+
+Une seule requests.Session (pool de connexions keep-alive) par manager. Les
+erreurs transitoires (connexion, timeout, 429, 5xx) sont réessayées avec un
+backoff exponentiel à jitter complet, en respectant l'en-tête Retry-After
+quand le fournisseur l'envoie. Les latences sont mesurées par endpoint.
+before_request (ex. SharedRateLimiter.acquire) est appelé avant chaque
+tentative, retries compris: chaque requête réellement envoyée est comptée.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 500  # fenêtre glissante pour les percentiles par endpoint
+
+def parse_retry_after(value):
+    """Délai en secondes depuis un en-tête Retry-After (secondes ou date HTTP), None si absent/invalide"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class ApiTransport:
+    def __init__(self, base_url, headers, pool_size=8, connect_timeout=5.0, read_timeout=20.0,
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0, before_request=None):
+        self.base_url = base_url.rstrip("/")
+        self.before_request = before_request
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Session partagée: connexions gardées ouvertes et réutilisées entre les appels
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Statistiques par endpoint (mises à jour depuis plusieurs threads)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def backoff_delay(self, attempt, response=None):
+        """Retry-After si fourni, sinon backoff exponentiel avec jitter complet"""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, endpoint, params=None):
+        """GET sur base_url/endpoint avec retries; retourne le JSON ou lève une RequestException"""
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            if self.before_request is not None:
+                self.before_request(endpoint)
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record(endpoint, time.perf_counter() - started, error=True)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                self._record(endpoint, time.perf_counter() - started, error=retryable or not response.ok,
+                             throttled=response.status_code == 429)
+                if not retryable or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+
+            delay = self.backoff_delay(attempt, response)
+            print(f"🔁 Nouvel essai {endpoint} dans {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            with self._stats_lock:
+                self._stats[endpoint]["retries"] += 1
+            time.sleep(delay)
+
+    def _record(self, endpoint, seconds, error=False, throttled=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0, "errors": 0, "throttled": 0, "retries": 0,
+                "total_seconds": 0.0, "samples": deque(maxlen=LATENCY_SAMPLES),
+            })
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["throttled"] += int(throttled)
+            stats["total_seconds"] += seconds
+            stats["samples"].append(seconds)
+
+    def latency_stats(self):
+        """Par endpoint: requêtes, erreurs, 429, retries, latence moyenne / p50 / p95 / max en ms"""
+        with self._stats_lock:
+            snapshot = {endpoint: dict(stats, samples=list(stats["samples"])) for endpoint, stats in self._stats.items()}
+        report = {}
+        for endpoint, stats in snapshot.items():
+            samples = np.array(stats["samples"]) * 1000
+            report[endpoint] = {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "throttled": stats["throttled"],
+                "retries": stats["retries"],
+                "avg_ms": stats["total_seconds"] * 1000 / stats["requests"],
+                "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)),
+                "max_ms": float(samples.max()),
+            }
+        return report
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,196 @@
+"""
+Backtest walk-forward des modèles de probabilités, avec mesure du temps
+
+Chaque match est prédit uniquement à partir des matchs joués les jours
+précédents. Pour le modèle par tranches d'ELO (calculate_probabilities),
+les comptes "avant ce jour, dans cette tranche" sont obtenus pour tous les
+matchs à la fois par un tri (tranche, jour) et des sommes cumulées: aucun
+index n'est reconstruit match par match. Le modèle par paliers
+(ladder_probabilities_batch) est évalué sur les mêmes matchs.
+
+Pour chaque marché: Brier, log-loss et courbe de calibration, plus le temps
+total et le débit en matchs par seconde.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import brier_score, calibration_curve, encode_results, log_loss, one_hot
+
+# Événements binaires évalués, dérivés des probabilités 1/X/2, O/U 2.5 et BTTS
+BINARY_MARKETS = ["home_win", "draw", "away_win", "home_or_draw", "away_or_draw", "home_or_away",
+                  "over_2_5", "btts_yes"]
+
+def _to_days(dates):
+    return np.asarray(pd.to_datetime(dates).values.astype("datetime64[D]").astype(np.int64))
+
+def walk_forward_bin_probabilities(elo_diff, days, results, home_goals, away_goals):
+    """
+    Probabilités de calculate_probabilities pour chaque match, calculées uniquement sur les
+    matchs des jours précédents. Tranche vide: fréquences globales avant ce jour.
+    Retourne (probabilités par marché, masque des matchs ayant un historique)
+    """
+    n_matches = len(elo_diff)
+    outcomes = np.column_stack([
+        results == 0,
+        results == 1,
+        results == 2,
+        home_goals + away_goals > 2.5,
+        (home_goals > 0) & (away_goals > 0),
+    ]).astype(np.int64)
+
+    # Tranche d'historique: [b - 25, b + 25) -> b = floor((diff + 25) / 50) * 50
+    history_bins = np.floor((elo_diff + 25) / 50).astype(np.int64)
+    query_bins = np.round(elo_diff / 50).astype(np.int64)
+    min_bin, max_bin = history_bins.min(), history_bins.max()
+    min_day = days.min()
+    span = int(days.max() - min_day) + 2
+
+    # Clé (tranche, jour) triée + sommes cumulées des résultats dans cet ordre
+    keys = (history_bins - min_bin) * span + (days - min_day)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    cumulative = np.zeros((n_matches + 1, outcomes.shape[1]), dtype=np.int64)
+    np.cumsum(outcomes[order], axis=0, out=cumulative[1:])
+
+    in_range = (query_bins >= min_bin) & (query_bins <= max_bin)
+    bin_offsets = np.clip(query_bins - min_bin, 0, max_bin - min_bin) * span
+    starts = np.searchsorted(keys, bin_offsets, side="left")
+    stops = np.searchsorted(keys, bin_offsets + (days - min_day), side="left")
+    totals = np.where(in_range, stops - starts, 0)
+    counts = np.where(in_range[:, None], cumulative[stops] - cumulative[starts], 0)
+
+    # Repli: fréquences sur tous les matchs des jours précédents
+    day_order = np.argsort(days, kind="stable")
+    sorted_days = days[day_order]
+    day_cumulative = np.zeros((n_matches + 1, outcomes.shape[1]), dtype=np.int64)
+    np.cumsum(outcomes[day_order], axis=0, out=day_cumulative[1:])
+    prior = np.searchsorted(sorted_days, days, side="left")
+    empty = totals == 0
+    totals = np.where(empty, prior, totals)
+    counts = np.where(empty[:, None], day_cumulative[prior], counts)
+
+    has_history = totals > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = counts / totals[:, None]
+    home_win, draw, away_win, over_2_5, btts_yes = rates.T
+    return _markets(home_win, draw, away_win, over_2_5, btts_yes), has_history
+
+def _markets(home_win, draw, away_win, over_2_5, btts_yes):
+    return {
+        "home_win": home_win,
+        "draw": draw,
+        "away_win": away_win,
+        "home_or_draw": home_win + draw,
+        "away_or_draw": away_win + draw,
+        "home_or_away": home_win + away_win,
+        "over_2_5": over_2_5,
+        "btts_yes": btts_yes,
+    }
+
+def evaluate_markets(probabilities, results, home_goals, away_goals, n_bins=10):
+    """Brier, log-loss et calibration pour chaque marché"""
+    observed = _markets(
+        (results == 0).astype(np.float64),
+        (results == 1).astype(np.float64),
+        (results == 2).astype(np.float64),
+        (home_goals + away_goals > 2.5).astype(np.float64),
+        ((home_goals > 0) & (away_goals > 0)).astype(np.float64),
+    )
+    # Les sommes de deux issues exclusives sont aussi des indicatrices
+    observed["home_or_draw"] = observed["home_win"] + observed["draw"]
+    observed["away_or_draw"] = observed["away_win"] + observed["draw"]
+    observed["home_or_away"] = observed["home_win"] + observed["away_win"]
+
+    three_way = np.column_stack([probabilities["home_win"], probabilities["draw"], probabilities["away_win"]])
+    report = {
+        "1x2": {
+            "brier": brier_score(three_way, one_hot(results)),
+            "log_loss": log_loss(three_way, one_hot(results)),
+        }
+    }
+    for market in BINARY_MARKETS:
+        report[market] = {
+            "brier": brier_score(probabilities[market], observed[market]),
+            "log_loss": log_loss(probabilities[market], observed[market]),
+            "calibration": calibration_curve(probabilities[market], observed[market], n_bins),
+        }
+    return report
+
+def run_backtest(history_df, ladder_probabilities=None, n_bins=10):
+    """
+    Backtest sur un historique trié par date (colonnes date, elo_diff, FTResult, FTHome, FTAway,
+    comme updated_elos_df dans elo_predictor). ladder_probabilities: fonction optionnelle
+    écarts ELO -> {marché: tableau} (ex. ladder_probabilities_batch) évaluée aussi.
+    """
+    results = encode_results(history_df["FTResult"].to_numpy())
+    home_goals = history_df["FTHome"].to_numpy(dtype=np.float64)
+    away_goals = history_df["FTAway"].to_numpy(dtype=np.float64)
+    elo_diff = history_df["elo_diff"].to_numpy(dtype=np.float64)
+    usable = (results >= 0) & ~np.isnan(home_goals) & ~np.isnan(away_goals) & ~np.isnan(elo_diff)
+    results, home_goals, away_goals, elo_diff = results[usable], home_goals[usable], away_goals[usable], elo_diff[usable]
+    days = _to_days(history_df["date"].to_numpy()[usable])
+
+    report = {}
+
+    started = time.perf_counter()
+    probabilities, has_history = walk_forward_bin_probabilities(elo_diff, days, results, home_goals, away_goals)
+    predict_seconds = time.perf_counter() - started
+    selected = {market: values[has_history] for market, values in probabilities.items()}
+    report["elo_bins"] = _model_report(
+        selected, results[has_history], home_goals[has_history], away_goals[has_history],
+        predict_seconds, started, n_bins
+    )
+
+    if ladder_probabilities is not None:
+        started = time.perf_counter()
+        ladder = ladder_probabilities(elo_diff)
+        predict_seconds = time.perf_counter() - started
+        selected = {market: np.asarray(ladder[market]) for market in BINARY_MARKETS}
+        report["ladder"] = _model_report(selected, results, home_goals, away_goals, predict_seconds, started, n_bins)
+
+    return report
+
+def _model_report(probabilities, results, home_goals, away_goals, predict_seconds, started, n_bins):
+    markets = evaluate_markets(probabilities, results, home_goals, away_goals, n_bins)
+    total_seconds = time.perf_counter() - started
+    n_matches = len(results)
+    return {
+        "matches": n_matches,
+        "markets": markets,
+        "predict_seconds": predict_seconds,
+        "total_seconds": total_seconds,
+        "matches_per_second": n_matches / total_seconds if total_seconds > 0 else float("inf"),
+    }
+
+def print_report(report):
+    """Affiche un résumé lisible du backtest"""
+    for model, model_report in report.items():
+        print(f"\n📈 Modèle: {model} ({model_report['matches']} matchs)")
+        print(f"   ⏱️  {model_report['total_seconds']:.3f}s, {model_report['matches_per_second']:,.0f} matchs/s")
+        for market, scores in model_report["markets"].items():
+            print(f"   {market:<14} Brier {scores['brier']:.4f}   log-loss {scores['log_loss']:.4f}")
+
+if __name__ == "__main__":
+    import sys
+    from columnar_cache import load_matches_columnar
+    from elo_checkpoints import incremental_replay
+
+    matches_path = sys.argv[1] if len(sys.argv) > 1 else "data/Matches.csv"
+    matches_df = load_matches_columnar(matches_path)
+    matches_df = matches_df.dropna(subset=["HomeTeam", "AwayTeam"]).reset_index(drop=True)
+    replay = incremental_replay(matches_df)
+
+    history_df = pd.DataFrame({
+        "date": matches_df["MatchDate"].to_numpy(),
+        "elo_diff": replay["home_elo_before"] - replay["away_elo_before"],
+        "FTResult": matches_df["FTResult"].to_numpy(),
+        "FTHome": matches_df["FTHome"].to_numpy(),
+        "FTAway": matches_df["FTAway"].to_numpy(),
+    })
+
+    # Fonction seule: pas de manager (quota, caches, mapping, current_elos.json) pour une échelle fixe
+    from efficient_data_manager import ladder_probabilities_batch
+    print_report(run_backtest(history_df, ladder_probabilities_batch))
@@ -0,0 +1,176 @@
+"""
+Cache colonnaire des CSV historiques (Matches.csv, EloRatings.csv)
+
+Chaque CSV est converti une seule fois en un dossier de fichiers .npy (une
+colonne par fichier), relus ensuite en memory-map. Les colonnes texte sont
+stockées en catégories (codes entiers + table des valeurs), les dates sont
+parsées et les lignes déjà triées. Le cache n'est reconstruit que si le CSV
+a changé (mtime/taille, puis empreinte SHA-256 pour confirmer).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "data/columnar"
+CACHE_VERSION = 1
+
+# Colonnes de Matches.csv utilisées par le replay ELO et les probabilités
+MATCH_COLUMNS = [
+    "Division", "MatchDate", "HomeTeam", "AwayTeam",
+    "FTHome", "FTAway", "FTResult", "Form5Home", "Form5Away",
+]
+MATCH_DTYPES = {
+    "Division": "category",
+    "HomeTeam": "string",
+    "AwayTeam": "string",
+    "FTHome": "float64",
+    "FTAway": "float64",
+    "FTResult": "category",
+    "Form5Home": "float64",
+    "Form5Away": "float64",
+}
+
+def file_sha256(path, block_size=1 << 20):
+    """Empreinte SHA-256 d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def _read_meta(table_dir):
+    try:
+        with open(os.path.join(table_dir, "meta.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_meta(table_dir, meta):
+    # meta.json est écrit en dernier et de façon atomique: il valide le cache
+    tmp_path = os.path.join(table_dir, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(table_dir, "meta.json"))
+
+def is_cache_fresh(csv_path, table_dir, options):
+    """Vérifie si le cache correspond encore au CSV (et met à jour le mtime si seul lui a changé)"""
+    meta = _read_meta(table_dir)
+    if not meta or meta.get("version") != CACHE_VERSION or meta.get("options") != options:
+        return False
+
+    signature = _source_signature(csv_path)
+    if meta["source"]["mtime_ns"] == signature["mtime_ns"] and meta["source"]["size"] == signature["size"]:
+        return True
+
+    # Fichier touché mais peut-être identique (copie, checkout git...)
+    if meta["source"]["size"] == signature["size"] and meta["source"]["sha256"] == file_sha256(csv_path):
+        meta["source"].update(signature)
+        _write_meta(table_dir, meta)
+        return True
+    return False
+
+def build_columnar_cache(csv_path, table_dir, usecols=None, dtypes=None, date_column=None,
+                         shared_categories=()):
+    """Convertit un CSV en dossier colonnaire (.npy par colonne)"""
+    df = pd.read_csv(csv_path, usecols=usecols, dtype=dtypes)
+
+    if date_column:
+        df[date_column] = pd.to_datetime(df[date_column])
+        df = df.sort_values(by=date_column, kind="stable").reset_index(drop=True)
+
+    # Les colonnes partageant leurs catégories (HomeTeam/AwayTeam) ont des codes comparables
+    shared_values = None
+    if shared_categories:
+        values = pd.concat([df[c].astype("string") for c in shared_categories]).dropna().unique()
+        shared_values = pd.Index(sorted(values))
+
+    if os.path.exists(table_dir):
+        shutil.rmtree(table_dir)
+    os.makedirs(table_dir)
+
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if column in shared_categories:
+            series = pd.Categorical(series.astype("string"), categories=shared_values)
+            kind = "categorical"
+        elif isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+            series = pd.Categorical(series.astype("string"))
+            kind = "categorical"
+        elif np.issubdtype(series.dtype, np.datetime64):
+            kind = "datetime"
+        else:
+            kind = "numeric"
+
+        if kind == "categorical":
+            np.save(os.path.join(table_dir, f"{column}.npy"), series.codes)
+            np.save(os.path.join(table_dir, f"{column}.categories.npy"),
+                    np.asarray(series.categories.astype(str), dtype=np.str_))
+        else:
+            np.save(os.path.join(table_dir, f"{column}.npy"), series.to_numpy())
+        columns[column] = kind
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": {**_source_signature(csv_path), "sha256": file_sha256(csv_path)},
+        "options": None,
+        "columns": columns,
+        "rows": len(df),
+    }
+    return meta
+
+def read_columnar_cache(table_dir, mmap=True):
+    """Relit un dossier colonnaire sous forme de DataFrame (colonnes en memory-map)"""
+    meta = _read_meta(table_dir)
+    mmap_mode = "r" if mmap else None
+    data = {}
+    for column, kind in meta["columns"].items():
+        values = np.load(os.path.join(table_dir, f"{column}.npy"), mmap_mode=mmap_mode)
+        if kind == "categorical":
+            categories = np.load(os.path.join(table_dir, f"{column}.categories.npy"))
+            data[column] = pd.Categorical.from_codes(values, categories=categories)
+        else:
+            data[column] = values
+    return pd.DataFrame(data, copy=False)
+
+def load_columnar(csv_path, cache_dir=CACHE_DIR, usecols=None, dtypes=None, date_column=None,
+                  shared_categories=(), mmap=True):
+    """Charge un CSV via son cache colonnaire, en le (re)construisant si nécessaire"""
+    table_dir = os.path.join(cache_dir, os.path.splitext(os.path.basename(csv_path))[0])
+    options = {
+        "usecols": list(usecols) if usecols else None,
+        "date_column": date_column,
+        "shared_categories": list(shared_categories),
+    }
+
+    if not is_cache_fresh(csv_path, table_dir, options):
+        print(f"🔄 Construction du cache colonnaire: {csv_path}")
+        meta = build_columnar_cache(csv_path, table_dir, usecols, dtypes, date_column, shared_categories)
+        meta["options"] = options
+        _write_meta(table_dir, meta)
+
+    return read_columnar_cache(table_dir, mmap=mmap)
+
+def load_matches_columnar(matches_path, cache_dir=CACHE_DIR, mmap=True):
+    """Matches.csv typé, dates parsées et trié par MatchDate"""
+    return load_columnar(
+        matches_path, cache_dir,
+        usecols=MATCH_COLUMNS,
+        dtypes=MATCH_DTYPES,
+        date_column="MatchDate",
+        shared_categories=("HomeTeam", "AwayTeam"),
+        mmap=mmap,
+    )
+
+def load_elo_ratings_columnar(elo_path, cache_dir=CACHE_DIR, mmap=True):
+    """EloRatings.csv typé, trié par date"""
+    return load_columnar(elo_path, cache_dir, date_column="date", mmap=mmap)
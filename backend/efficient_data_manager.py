@@ -1,24 +1,142 @@
+import asyncio
 import requests
 import pandas as pd
+import numpy as np
 import json
-from datetime import datetime, timedelta
-import time
+from datetime import datetime, timezone
 import os
-from elo_predictor import calculate_elo_change, calculate_probabilities, get_k_factor
+import tempfile
+import threading
+from elo_predictor import calculate_elo_change, get_k_factor
 from team_name_mapping import TeamNameMapper
+from team_registry import RatingStore, TeamRegistry
+from rate_limiter import QuotaExceeded, RateLimited, SharedRateLimiter
+from api_transport import ApiTransport
+from quota_ledger import QuotaLedger
+from response_cache import ResponseCache, cache_key
+from single_flight import SingleFlight
+
+DEFAULT_BASE_URL = "https://api-football-v1.p.rapidapi.com/v3"
+PRIORITY_LEAGUES = [39, 140, 135, 78, 61]  # Top 5 ligues européennes
+SEASON_START_MONTH = 7  # saisons août-mai: une date à partir de juillet ouvre la saison suivante
+
+FIXTURES_FRESH_SECONDS = 7200  # 2 heures: au-delà, le fichier du jour est rafraîchi en arrière-plan
+FIXTURES_MAX_STALE_SECONDS = 86400  # au-delà, on attend le rafraîchissement plutôt que servir du périmé
+
+# Échelle de probabilités par écart ELO effectif (avantage domicile inclus).
+# Bornes basses des paliers, triées: le palier d'un écart est donné par np.searchsorted.
+LADDER_BREAKPOINTS = np.array([-100, -50, 0, 50, 100, 200], dtype=np.float64)
+# Une ligne par palier, du plus bas (< -100) au plus haut (>= 200): 1, X, 2, plus de 2.5, BTTS oui
+LADDER_PROBABILITIES = np.array([
+    [0.32, 0.25, 0.43, 0.47, 0.49],
+    [0.38, 0.27, 0.35, 0.49, 0.52],
+    [0.44, 0.28, 0.28, 0.50, 0.54],
+    [0.48, 0.27, 0.25, 0.51, 0.53],
+    [0.52, 0.26, 0.22, 0.52, 0.52],
+    [0.58, 0.24, 0.18, 0.54, 0.51],
+    [0.65, 0.22, 0.13, 0.58, 0.48],
+])
+MARKETS = ["home_win", "draw", "away_win", "home_or_draw", "away_or_draw", "home_or_away",
+           "over_2_5", "under_2_5", "btts_yes", "btts_no"]
+
+def market_matrix(home_win, draw, away_win, over_25, btts_yes):
+    """Matrice (n, len(MARKETS)) de tous les marchés dérivés des probabilités de base"""
+    return np.column_stack([
+        home_win, draw, away_win,
+        home_win + draw, away_win + draw, home_win + away_win,
+        over_25, 1 - over_25, btts_yes, 1 - btts_yes,
+    ])
+
+# Tous les marchés précalculés par palier: une prédiction est une lecture de ligne
+LADDER_MARKETS = market_matrix(*LADDER_PROBABILITIES.T)
+
+# Paris candidats pour le meilleur pari (ordre = priorité en cas d'égalité)
+BEST_BETS = [
+    ("Victoire Dom.", "home_win", "1"),
+    ("Match Nul", "draw", "X"),
+    ("Victoire Ext.", "away_win", "2"),
+    ("Plus 2.5", "over_2_5", "O2.5"),
+    ("Moins 2.5", "under_2_5", "U2.5"),
+    ("BTTS Oui", "btts_yes", "BTTS"),
+]
+BEST_BET_COLUMNS = np.array([MARKETS.index(market) for _, market, _ in BEST_BETS])
+LADDER_BEST_BETS = np.argmax(LADDER_MARKETS[:, BEST_BET_COLUMNS], axis=1)
+
+def ladder_buckets(elo_diffs, home_advantage=100):
+    """Palier de l'échelle pour un tableau d'écarts ELO (NaN -> palier le plus bas, comme le else)"""
+    effective_diff = np.asarray(elo_diffs, dtype=np.float64) + home_advantage
+    buckets = np.searchsorted(LADDER_BREAKPOINTS, effective_diff, side="right")
+    return np.where(np.isnan(effective_diff), 0, buckets)
+
+def ladder_probabilities_batch(elo_diffs, home_advantage=100):
+    """Probabilités de l'échelle pour un tableau d'écarts ELO: un tableau par marché (sans manager)"""
+    markets = LADDER_MARKETS[ladder_buckets(elo_diffs, home_advantage)]
+    return {market: markets[:, i] for i, market in enumerate(MARKETS)}
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Écrit un JSON dans un fichier temporaire du même dossier puis le renomme (os.replace)"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def season_for_date(date):
+    """Année de début de la saison API-Football pour une date 'YYYY-MM-DD' (2025-03-01 -> 2024)"""
+    day = datetime.strptime(date, "%Y-%m-%d") if isinstance(date, str) else date
+    return day.year if day.month >= SEASON_START_MONTH else day.year - 1
 
 class EfficientDataManager:
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, priority_leagues=None,
+                 max_concurrency=8, requests_per_second=5, rate_limit_policy="block",
+                 stale_while_revalidate=False, on_fixtures_refreshed=None):
         self.api_key = api_key
-        self.base_url = "https://api-football-v1.p.rapidapi.com/v3"
+        self.base_url = base_url.rstrip("/")
         self.headers = {
             "X-RapidAPI-Key": api_key,
             "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
         }
-        self.current_elos = {}
-        self.daily_api_calls = 0
+        # ELO stockés par ID d'équipe (les noms ne servent qu'en entrée/sortie)
+        self.team_registry = TeamRegistry()
+        self.ratings = RatingStore(self.team_registry)
+        self._saved_ratings_version = None  # version des ELO déjà écrite dans current_elos.json
+        # Compteur d'appels quotidien dans SQLite, remis à zéro au changement de jour UTC
+        self.quota_ledger = QuotaLedger()
         self.max_daily_calls = 35000  # Limite sécurisée sous les 40,000
         self.cache_duration = 1800  # 30 minutes de cache pour les données fréquentes
+        # Cache des réponses: LRU mémoire + SQLite, TTL par endpoint, taille plafonnée
+        self.response_cache = ResponseCache(default_ttl=self.cache_duration)
+        # Appels identiques simultanés (scheduler, /api/refresh...): une seule requête partagée
+        self.single_flight = SingleFlight()
+        
+        # Fichiers fixtures_{date}.json: servis immédiatement, rafraîchis en arrière-plan si périmés.
+        # Réservé aux serveurs: un script qui se termine n'attendrait pas le rafraîchissement.
+        # on_fixtures_refreshed(date, matchs) publie le résultat du rafraîchissement en arrière-plan
+        self.stale_while_revalidate = stale_while_revalidate
+        self.on_fixtures_refreshed = on_fixtures_refreshed
+        self._fixture_locks = {}
+        self._fixture_locks_guard = threading.Lock()
+        
+        # Récupération concurrente: ligues suivies (ensemble vide = toutes), requêtes simultanées, débit maximal
+        self.priority_leagues = set(PRIORITY_LEAGUES if priority_leagues is None else priority_leagues)
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        
+        # Débit et quota partagés par tous les processus de la machine (même fichier SQLite)
+        self.rate_limiter = SharedRateLimiter(
+            self.quota_ledger, requests_per_second, self.max_daily_calls, policy=rate_limit_policy
+        )
+        
+        # Transport HTTP: session keep-alive, timeouts, retries avec backoff, latences par endpoint
+        self.transport = ApiTransport(
+            self.base_url, self.headers, pool_size=max_concurrency, before_request=self.rate_limiter.acquire
+        )
         
         # Initialiser le mapper de noms d'équipes
         self.team_mapper = TeamNameMapper()
@@ -33,29 +151,61 @@ class EfficientDataManager:
             if os.path.exists("data/current_elos.json"):
                 with open("data/current_elos.json", "r") as f:
                     data = json.load(f)
-                    self.current_elos = data.get("elos", {})
-                    self.daily_api_calls = data.get("daily_calls", 0)
-                print(f"✅ ELO chargés: {len(self.current_elos)} équipes, {self.daily_api_calls} appels utilisés")
+                    self.replace_elos(data.get("elos", {}))
+                self.migrate_daily_calls(data)
+                self._saved_ratings_version = self.ratings.version
+                print(f"✅ ELO chargés: {len(self.ratings)} équipes, {self.daily_api_calls} appels utilisés")
             else:
                 # Charger depuis le dataset initial
                 elo_df = pd.read_csv("data/EloRatings.csv")
-                self.current_elos = dict(zip(elo_df["club"], elo_df["elo"]))
+                self.replace_elos(dict(zip(elo_df["club"], elo_df["elo"])))
                 self.save_current_elos()
-                print(f"✅ ELO initialisés: {len(self.current_elos)} équipes")
+                print(f"✅ ELO initialisés: {len(self.ratings)} équipes")
         except Exception as e:
             print(f"❌ Erreur lors du chargement: {e}")
-            self.current_elos = {}
+            self.replace_elos({})
+    
+    def migrate_daily_calls(self, data):
+        """Ancien format de current_elos.json: reporte daily_calls dans le compteur SQLite si c'est le même jour"""
+        if "daily_calls" not in data or "last_update" not in data:
+            return
+        try:
+            # last_update était écrit en heure locale (datetime.now())
+            last_update = datetime.fromisoformat(data["last_update"]).astimezone(timezone.utc)
+        except (TypeError, ValueError):
+            return
+        day = self.quota_ledger.current_day(last_update)
+        if day == self.quota_ledger.current_day():
+            self.quota_ledger.seed_day(day, data["daily_calls"])
+    
+    def elos_snapshot(self):
+        """Copie {nom: ELO} des ratings, en lecture seule (pour une équipe: self.ratings.get(nom))"""
+        return self.ratings.to_dict()
+    
+    def replace_elos(self, elos):
+        """Remplace tous les ratings par un dict {nom: ELO}"""
+        self.team_registry = TeamRegistry()
+        self.ratings = RatingStore.from_dict(elos, self.team_registry)
+        self._saved_ratings_version = None
+    
+    @property
+    def daily_api_calls(self):
+        """Appels API du jour, lus dans le compteur partagé"""
+        return self.quota_ledger.calls_today()
     
     def save_current_elos(self):
-        """Sauvegarde les ELO et le compteur d'appels"""
+        """Sauvegarde les ELO, seulement s'ils ont changé depuis la dernière écriture"""
+        if self.ratings.version == self._saved_ratings_version:
+            return False
         os.makedirs("data", exist_ok=True)
         data = {
-            "elos": self.current_elos,
-            "daily_calls": self.daily_api_calls,
+            "elos": self.ratings.to_dict(),
             "last_update": datetime.now().isoformat()
         }
         with open("data/current_elos.json", "w") as f:
             json.dump(data, f, indent=2)
+        self._saved_ratings_version = self.ratings.version
+        return True
     
     def can_make_api_call(self):
         """Vérifie si on peut faire un appel API"""
@@ -68,64 +218,86 @@ class EfficientDataManager:
             return None
         
         # Vérifier le cache d'abord
-        cache_key = f"{endpoint}_{str(params)}"
-        cached_data = self.get_cached_data(cache_key)
+        cached_data = self.get_cached_data(endpoint, params)
         if cached_data:
             print(f"📁 Données depuis le cache: {endpoint}")
             return cached_data
         
-        url = f"{self.base_url}/{endpoint}"
-        try:
-            print(f"🔄 Appel API: {endpoint} (appel #{self.daily_api_calls + 1})")
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            
-            self.daily_api_calls += 1
-            self.save_current_elos()  # Sauvegarder le compteur
-            
-            data = response.json()
-            if data.get("errors"):
-                print(f"❌ Erreur API: {data['errors']}")
+        return self.fetch_coalesced(endpoint, params)
+    
+    def fetch_coalesced(self, endpoint, params=None):
+        """Requête après un cache manqué; les appels identiques simultanés partagent la même requête"""
+        def fetch():
+            # Un appel identique a pu se terminer entre le cache manqué et l'entrée ici
+            cached_data = self.response_cache.get(endpoint, params, record=False)
+            if cached_data:
+                return cached_data
+            if not self.can_make_api_call():
+                print(f"⚠️  Limite d'appels atteinte ({self.max_daily_calls})")
                 return None
-            
-            # Mettre en cache
-            self.cache_data(cache_key, data)
-            return data
-            
+            print(f"🔄 Appel API: {endpoint} (appel #{self.daily_api_calls + 1})")
+            return self.record_api_response(endpoint, params, self.send_request(endpoint, params))
+        
+        return self.single_flight.do(cache_key(endpoint, params), fetch)
+    
+    def send_request(self, endpoint, params=None):
+        """Requête HTTP via le transport (retries et limiteur inclus); retourne le JSON, ou None en cas d'échec"""
+        try:
+            return self.transport.get(endpoint, params)
+        except (QuotaExceeded, RateLimited) as e:
+            print(f"⚠️  {e}")
+            return None
         except requests.exceptions.RequestException as e:
             print(f"❌ Erreur de requête: {e}")
             return None
     
-    def get_cached_data(self, cache_key):
-        """Récupère les données du cache si valides"""
-        cache_file = f"data/cache/{cache_key}.json"
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, "r") as f:
-                    cached = json.load(f)
-                
-                cache_time = datetime.fromisoformat(cached["timestamp"])
-                if (datetime.now() - cache_time).seconds < self.cache_duration:
-                    return cached["data"]
-            except:
-                pass
-        return None
-    
-    def cache_data(self, cache_key, data):
-        """Met les données en cache"""
-        os.makedirs("data/cache", exist_ok=True)
-        cache_file = f"data/cache/{cache_key}.json"
+    def record_api_response(self, endpoint, params, data):
+        """Met la réponse en cache (l'appel a déjà été compté par le limiteur)"""
+        if data is None:
+            return None
         
-        cached = {
-            "timestamp": datetime.now().isoformat(),
-            "data": data
-        }
+        if data.get("errors"):
+            print(f"❌ Erreur API: {data['errors']}")
+            return None
+        
+        # Mettre en cache
+        self.cache_data(endpoint, params, data)
+        return data
+    
+    async def make_api_calls_async(self, calls):
+        """
+        Effectue plusieurs appels [(endpoint, params), ...] en parallèle; résultats dans le même ordre.
+        Les requêtes HTTP tournent dans des threads (session partagée), limitées par un sémaphore
+        et par le limiteur partagé, et passent par le même regroupement que make_api_call.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        with open(cache_file, "w") as f:
-            json.dump(cached, f)
+        async def call(endpoint, params):
+            cached_data = self.get_cached_data(endpoint, params)
+            if cached_data:
+                print(f"📁 Données depuis le cache: {endpoint}")
+                return cached_data
+            
+            async with semaphore:
+                return await asyncio.to_thread(self.fetch_coalesced, endpoint, params)
+        
+        return await asyncio.gather(*(call(endpoint, params) for endpoint, params in calls))
+    
+    def get_cached_data(self, endpoint, params=None):
+        """Récupère les données du cache si valides (TTL de l'endpoint)"""
+        return self.response_cache.get(endpoint, params)
     
-    def get_today_fixtures_smart(self, date=None):
-        """Récupère les matchs du jour de manière intelligente"""
+    def cache_data(self, endpoint, params, data):
+        """Met les données en cache"""
+        self.response_cache.set(endpoint, params, data)
+    
+    def get_today_fixtures_smart(self, date=None, allow_stale=None):
+        """
+        Récupère les matchs du jour de manière intelligente. allow_stale=False force des
+        données fraîches (mise à jour demandée, ELO); None: réglage stale_while_revalidate.
+        """
+        if allow_stale is None:
+            allow_stale = self.stale_while_revalidate
         if date is None:
             date = datetime.now().strftime("%Y-%m-%d")
         
@@ -133,60 +305,124 @@ class EfficientDataManager:
         
         # Vérifier d'abord le cache complet
         cache_file = f"data/daily_predictions/fixtures_{date}.json"
-        if os.path.exists(cache_file):
+        cached_fixtures, age = self.read_fixtures_cache(cache_file)
+        if cached_fixtures is not None:
+            if age < FIXTURES_FRESH_SECONDS:
+                print(f"📁 Matchs chargés depuis le cache ({len(cached_fixtures)} matchs)")
+                return cached_fixtures
+            if allow_stale and age < FIXTURES_MAX_STALE_SECONDS:
+                # Réponse immédiate avec le cache périmé, un seul rafraîchissement en arrière-plan par date
+                if self.refresh_fixtures_in_background(date):
+                    print(f"📁 Cache périmé servi ({age / 60:.0f} min), rafraîchissement en arrière-plan")
+                return cached_fixtures
+        
+        # Pas de cache utilisable: on attend le rafraîchissement (ou celui déjà en cours pour cette date)
+        lock = self._fixture_lock(date)
+        with lock:
+            cached_fixtures, age = self.read_fixtures_cache(cache_file)
+            if cached_fixtures is not None and age < FIXTURES_FRESH_SECONDS:
+                return cached_fixtures
+            refreshed = self.refresh_fixtures(date)
+        return refreshed if refreshed is not None else (cached_fixtures or [])
+    
+    def read_fixtures_cache(self, cache_file):
+        """(matchs, âge en secondes) depuis fixtures_{date}.json, ou (None, None)"""
+        try:
+            with open(cache_file, "r") as f:
+                cached_fixtures = json.load(f)
+            cache_time = datetime.fromisoformat(cached_fixtures["timestamp"])
+            return cached_fixtures["fixtures"], (datetime.now() - cache_time).total_seconds()
+        except (OSError, ValueError, KeyError):
+            return None, None
+    
+    def _fixture_lock(self, date):
+        with self._fixture_locks_guard:
+            return self._fixture_locks.setdefault(date, threading.Lock())
+    
+    def refresh_fixtures_in_background(self, date):
+        """Lance le rafraîchissement de la date dans un thread, sauf s'il est déjà en cours"""
+        lock = self._fixture_lock(date)
+        if not lock.acquire(blocking=False):
+            return False
+        
+        def refresh():
             try:
-                with open(cache_file, "r") as f:
-                    cached_fixtures = json.load(f)
-                
-                cache_time = datetime.fromisoformat(cached_fixtures["timestamp"])
-                if (datetime.now() - cache_time).seconds < 7200:  # 2 heures de cache
-                    print(f"📁 Matchs chargés depuis le cache ({len(cached_fixtures['fixtures'])} matchs)")
-                    return cached_fixtures["fixtures"]
-            except:
-                pass
+                fixtures = self.refresh_fixtures(date)
+                if fixtures is not None and self.on_fixtures_refreshed is not None:
+                    self.on_fixtures_refreshed(date, fixtures)
+            except Exception as e:
+                print(f"❌ Erreur de rafraîchissement des matchs du {date}: {e}")
+            finally:
+                lock.release()
         
-        # Récupérer seulement les ligues prioritaires
-        priority_leagues = [39, 140, 135, 78, 61]  # Top 5 ligues européennes
-        all_fixtures = []
+        threading.Thread(target=refresh, name=f"fixtures-refresh-{date}", daemon=True).start()
+        return True
+    
+    def refresh_fixtures(self, date):
+        """Récupère les matchs de la date et remplace fixtures_{date}.json de façon atomique"""
+        # Tous les matchs de la date en un minimum d'appels, puis filtrage local par ligue
+        fixtures = self.fetch_fixtures_for_date(date)
+        if fixtures is None:
+            fixtures = self.fetch_league_fixtures(date, self.priority_leagues)
+            if not fixtures:
+                # Échec complet: on garde le fichier existant plutôt que l'écraser par une liste vide
+                print(f"⚠️  Matchs du {date} indisponibles, cache conservé")
+                return None
         
-        for league_id in priority_leagues:
-            if not self.can_make_api_call():
-                print(f"⚠️  Arrêt - limite d'appels atteinte")
-                break
-            
-            # Déterminer dynamiquement la saison
-            current_year = datetime.strptime(date, "%Y-%m-%d").year
-            season = current_year
-
-            params = {
-                "league": league_id,
-                "date": date,
-                "season": str(season)
-            }
-            
-            data = self.make_api_call("fixtures", params)
-            if data and data.get("response"):
-                fixtures = data["response"]
-                for fixture in fixtures:
-                    match_info = self.parse_fixture(fixture)
-                    if match_info:
-                        all_fixtures.append(match_info)
-                
-                print(f"✅ {len(fixtures)} matchs - {data['response'][0]['league']['name'] if fixtures else 'Ligue inconnue'}")
-                time.sleep(0.2)  # Délai entre les appels
+        all_fixtures = []
+        for fixture in fixtures:
+            if self.priority_leagues and fixture.get("league", {}).get("id") not in self.priority_leagues:
+                continue
+            match_info = self.parse_fixture(fixture)
+            if match_info:
+                all_fixtures.append(match_info)
+        print(f"✅ {len(all_fixtures)} matchs retenus sur {len(fixtures)} ce jour-là")
         
-        # Sauvegarder en cache
-        os.makedirs("data/daily_predictions", exist_ok=True)
+        # Sauvegarder en cache (remplacement atomique: un lecteur ne voit jamais un fichier partiel)
         cache_data = {
             "timestamp": datetime.now().isoformat(),
             "fixtures": all_fixtures
         }
-        with open(cache_file, "w") as f:
-            json.dump(cache_data, f, indent=2)
+        write_json_atomic(f"data/daily_predictions/fixtures_{date}.json", cache_data, indent=2)
         
         print(f"📊 Total: {len(all_fixtures)} matchs récupérés ({self.daily_api_calls} appels utilisés)")
         return all_fixtures
     
+    def fetch_fixtures_for_date(self, date):
+        """
+        Tous les matchs d'une date, toutes ligues confondues: un appel, plus les pages
+        suivantes en parallèle si la réponse est paginée. None si un appel échoue
+        (une liste incomplète serait enregistrée comme la liste du jour).
+        """
+        first_page = self.make_api_call("fixtures", {"date": date})
+        if first_page is None:
+            return None
+        
+        fixtures = list(first_page.get("response") or [])
+        total_pages = (first_page.get("paging") or {}).get("total", 1) or 1
+        if total_pages > 1:
+            calls = [("fixtures", {"date": date, "page": page}) for page in range(2, total_pages + 1)]
+            pages = asyncio.run(self.make_api_calls_async(calls))
+            if any(data is None for data in pages):
+                print(f"⚠️  Pagination incomplète pour le {date}, réponse ignorée")
+                return None
+            for data in pages:
+                fixtures.extend(data.get("response") or [])
+        return fixtures
+    
+    def fetch_league_fixtures(self, date, league_ids):
+        """Repli: un appel par ligue (en parallèle), avec la saison correspondant à la date"""
+        season = season_for_date(date)
+        calls = [
+            ("fixtures", {"league": league_id, "date": date, "season": str(season)})
+            for league_id in sorted(league_ids)
+        ]
+        fixtures = []
+        for data in asyncio.run(self.make_api_calls_async(calls)):
+            if data and data.get("response"):
+                fixtures.extend(data["response"])
+        return fixtures
+    
     def parse_fixture(self, fixture):
         """Parse un match depuis l'API"""
         try:
@@ -198,13 +434,13 @@ class EfficientDataManager:
             away_team = self.team_mapper.map_team_name(api_away_team)
             
             # Obtenir les ELO actuels
-            home_elo = self.current_elos.get(home_team, 1500)
-            away_elo = self.current_elos.get(away_team, 1500)
+            home_elo = self.ratings.get(home_team)
+            away_elo = self.ratings.get(away_team)
             
             # Log si ELO par défaut utilisé
-            if home_elo == 1500 and home_team not in self.current_elos:
+            if home_team not in self.ratings:
                 print(f"⚠️  ELO par défaut pour: {home_team} (API: {api_home_team})")
-            if away_elo == 1500 and away_team not in self.current_elos:
+            if away_team not in self.ratings:
                 print(f"⚠️  ELO par défaut pour: {away_team} (API: {api_away_team})")
             
             match_info = {
@@ -241,75 +477,42 @@ class EfficientDataManager:
     
     def get_match_predictions(self, matches):
         """Calcule les prédictions sans appels API supplémentaires"""
-        predictions = []
+        upcoming = [match for match in matches if not match["finished"]]
+        if not upcoming:
+            return []
         
-        for match in matches:
-            if not match["finished"]:
-                # Calculer les probabilités basées sur l'ELO
-                probabilities = self.calculate_match_probabilities(match["elo_diff"])
-                
-                prediction = {
-                    **match,
-                    "probabilities": probabilities,
-                    "best_bet": self.get_best_bet(probabilities) if probabilities else None
-                }
-                predictions.append(prediction)
+        # Tous les matchs du jour d'un coup: paliers, marchés et meilleur pari en tableaux
+        buckets = ladder_buckets([match["elo_diff"] for match in upcoming])
+        market_rows = LADDER_MARKETS[buckets].tolist()
+        best_bets = LADDER_BEST_BETS[buckets].tolist()
+        
+        # Les dicts ne sont construits que pour la réponse JSON
+        predictions = []
+        for match, row, best in zip(upcoming, market_rows, best_bets):
+            name, market, bet_type = BEST_BETS[best]
+            probabilities = dict(zip(MARKETS, row))
+            predictions.append({
+                **match,
+                "probabilities": probabilities,
+                "best_bet": {"name": name, "prob": probabilities[market], "type": bet_type}
+            })
         
         return predictions
     
     def calculate_match_probabilities(self, elo_diff):
-        """Calcule les probabilités basées sur l'écart ELO"""
-        home_advantage = 100
-        effective_diff = elo_diff + home_advantage
-        
-        # Probabilités basées sur l'historique (même logique que l'interface)
-        if effective_diff >= 200:
-            prob_home_win, prob_draw, prob_away_win = 0.65, 0.22, 0.13
-            prob_over_25, prob_btts_yes = 0.58, 0.48
-        elif effective_diff >= 100:
-            prob_home_win, prob_draw, prob_away_win = 0.58, 0.24, 0.18
-            prob_over_25, prob_btts_yes = 0.54, 0.51
-        elif effective_diff >= 50:
-            prob_home_win, prob_draw, prob_away_win = 0.52, 0.26, 0.22
-            prob_over_25, prob_btts_yes = 0.52, 0.52
-        elif effective_diff >= 0:
-            prob_home_win, prob_draw, prob_away_win = 0.48, 0.27, 0.25
-            prob_over_25, prob_btts_yes = 0.51, 0.53
-        elif effective_diff >= -50:
-            prob_home_win, prob_draw, prob_away_win = 0.44, 0.28, 0.28
-            prob_over_25, prob_btts_yes = 0.50, 0.54
-        elif effective_diff >= -100:
-            prob_home_win, prob_draw, prob_away_win = 0.38, 0.27, 0.35
-            prob_over_25, prob_btts_yes = 0.49, 0.52
-        else:
-            prob_home_win, prob_draw, prob_away_win = 0.32, 0.25, 0.43
-            prob_over_25, prob_btts_yes = 0.47, 0.49
-        
-        return {
-            "home_win": prob_home_win,
-            "draw": prob_draw,
-            "away_win": prob_away_win,
-            "home_or_draw": prob_home_win + prob_draw,
-            "away_or_draw": prob_away_win + prob_draw,
-            "home_or_away": prob_home_win + prob_away_win,
-            "over_2_5": prob_over_25,
-            "under_2_5": 1 - prob_over_25,
-            "btts_yes": prob_btts_yes,
-            "btts_no": 1 - prob_btts_yes
-        }
+        """Calcule les probabilités basées sur l'écart ELO (lecture dans la table des paliers)"""
+        bucket = int(ladder_buckets([elo_diff])[0])
+        return dict(zip(MARKETS, LADDER_MARKETS[bucket].tolist()))
+    
+    def calculate_match_probabilities_batch(self, elo_diffs):
+        """Version vectorisée de calculate_match_probabilities: un tableau par marché"""
+        return ladder_probabilities_batch(elo_diffs)
     
     def get_best_bet(self, probabilities):
         """Détermine le meilleur pari"""
-        bets = [
-            {"name": "Victoire Dom.", "prob": probabilities["home_win"], "type": "1"},
-            {"name": "Match Nul", "prob": probabilities["draw"], "type": "X"},
-            {"name": "Victoire Ext.", "prob": probabilities["away_win"], "type": "2"},
-            {"name": "Plus 2.5", "prob": probabilities["over_2_5"], "type": "O2.5"},
-            {"name": "Moins 2.5", "prob": probabilities["under_2_5"], "type": "U2.5"},
-            {"name": "BTTS Oui", "prob": probabilities["btts_yes"], "type": "BTTS"}
-        ]
-        
-        return max(bets, key=lambda x: x["prob"])
+        values = [probabilities[market] for _, market, _ in BEST_BETS]
+        name, market, bet_type = BEST_BETS[int(np.argmax(values))]
+        return {"name": name, "prob": probabilities[market], "type": bet_type}
     
     def update_elos_with_results(self, finished_matches):
         """Met à jour les ELO avec les résultats"""
@@ -322,8 +525,9 @@ class EfficientDataManager:
                 home_goals = match["home_goals"]
                 away_goals = match["away_goals"]
                 
-                home_elo = self.current_elos.get(home_team, 1500)
-                away_elo = self.current_elos.get(away_team, 1500)
+                home_id = self.team_registry.intern(home_team)
+                away_id = self.team_registry.intern(away_team)
+                home_elo, away_elo = self.ratings.get_ids([home_id, away_id]).tolist()
                 
                 # Calculer les changements ELO
                 k_factor = get_k_factor("E0", abs(home_goals - away_goals), 5, 5)
@@ -332,11 +536,11 @@ class EfficientDataManager:
                 )
                 
                 # Mettre à jour
-                self.current_elos[home_team] = home_elo + change_home
-                self.current_elos[away_team] = away_elo + change_away
+                self.ratings.set_id(home_id, home_elo + change_home)
+                self.ratings.set_id(away_id, away_elo + change_away)
                 
                 updated_count += 1
-                print(f"✅ ELO mis à jour: {home_team} ({home_elo:.1f} → {self.current_elos[home_team]:.1f})")
+                print(f"✅ ELO mis à jour: {home_team} ({home_elo:.1f} → {home_elo + change_home:.1f})")
         
         if updated_count > 0:
             self.save_current_elos()
@@ -346,11 +550,17 @@ class EfficientDataManager:
     
     def get_api_usage_stats(self):
         """Retourne les statistiques d'utilisation de l'API"""
+        daily_calls = self.daily_api_calls
         return {
-            "daily_calls": self.daily_api_calls,
+            "daily_calls": daily_calls,
             "max_calls": self.max_daily_calls,
-            "remaining": self.max_daily_calls - self.daily_api_calls,
-            "percentage_used": (self.daily_api_calls / self.max_daily_calls) * 100
+            "remaining": self.max_daily_calls - daily_calls,
+            "percentage_used": (daily_calls / self.max_daily_calls) * 100,
+            "seconds_until_reset": self.quota_ledger.seconds_until_reset(),
+            "cache": self.response_cache.stats(),
+            "coalescing": self.single_flight.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "latency": self.transport.latency_stats()
         }
 
 def efficient_daily_update(api_key):
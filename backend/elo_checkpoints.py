@@ -0,0 +1,203 @@
+"""
+Replay ELO incrémental avec points de reprise (checkpoints)
+
+L'état des ratings est sauvegardé tous les `checkpoint_every` matchs, avec
+l'empreinte des lignes rejouées entre deux checkpoints. Au lancement suivant,
+on reprend depuis le dernier checkpoint dont tout l'historique précédent est
+inchangé: ajouter des matchs ne rejoue que le delta, et modifier une ligne
+ancienne invalide tous les checkpoints situés après elle. Les ELO initiaux
+sont comparés équipe par équipe: une nouvelle équipe (promue, nouvelle ligue)
+n'invalide que les checkpoints qui la contiennent déjà.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from elo_predictor import prepare_replay_arrays, replay_arrays
+from team_registry import RatingStore
+
+CHECKPOINT_DIR = "data/checkpoints/elo_replay"
+CHECKPOINT_VERSION = 2
+
+# Colonnes qui influencent le replay: toute modification invalide la suite
+KEY_COLUMNS = ["MatchDate", "HomeTeam", "AwayTeam", "FTHome", "FTAway", "Division", "Form5Home", "Form5Away"]
+HISTORY_ARRAYS = ["home_elo_before", "away_elo_before", "home_elo_after", "away_elo_after"]
+STATE_ARRAYS = ["teams", "initial_ratings", "snapshots"] + HISTORY_ARRAYS
+
+def row_hashes(matches_df):
+    """Empreinte uint64 de chaque ligne (sur les colonnes utilisées par le replay)"""
+    columns = matches_df[KEY_COLUMNS].copy()
+    for column in ("HomeTeam", "AwayTeam", "Division"):
+        columns[column] = columns[column].astype(str)
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+def segment_digest(hashes, start, stop):
+    """Empreinte d'un segment de lignes [start, stop)"""
+    return hashlib.sha1(np.ascontiguousarray(hashes[start:stop]).tobytes()).hexdigest()
+
+def params_digest(home_advantage, default_elo):
+    """Empreinte des paramètres globaux du replay: si elle change, tout est rejoué"""
+    return hashlib.sha1(json.dumps([home_advantage, default_elo]).encode()).hexdigest()
+
+def load_checkpoints(checkpoint_dir=CHECKPOINT_DIR):
+    """Charge les checkpoints existants (ou None)"""
+    try:
+        with open(os.path.join(checkpoint_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("version") != CHECKPOINT_VERSION:
+        return None
+
+    state = {"meta": meta}
+    for name in STATE_ARRAYS:
+        state[name] = np.load(os.path.join(checkpoint_dir, f"{name}.npy"), mmap_mode="r")
+    return state
+
+def save_checkpoints(state, checkpoint_dir=CHECKPOINT_DIR):
+    """Sauvegarde les checkpoints (meta.json écrit en dernier)"""
+    tmp_dir = checkpoint_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    for name in STATE_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), state[name])
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(state["meta"], f, indent=2)
+
+    if os.path.exists(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
+    os.replace(tmp_dir, checkpoint_dir)
+
+def find_resume_point(checkpoints, hashes, digest, initial_ratings):
+    """
+    Indice du dernier checkpoint réutilisable (0 = tout rejouer): lignes inchangées
+    jusqu'à lui et mêmes ELO initiaux pour les équipes qu'il couvre
+    """
+    if checkpoints is None or checkpoints["meta"]["params"] != digest:
+        return 0
+
+    positions = checkpoints["meta"]["positions"]
+    team_counts = checkpoints["meta"]["team_counts"]
+    digests = checkpoints["meta"]["segment_digests"]
+    saved_initial = checkpoints["initial_ratings"]
+    resume = 0
+    for i in range(1, len(positions)):
+        if positions[i] > len(hashes) or segment_digest(hashes, positions[i - 1], positions[i]) != digests[i]:
+            break
+        # Mêmes lignes jusqu'ici => mêmes IDs pour les team_counts[i] premières équipes
+        if not np.array_equal(saved_initial[:team_counts[i]], initial_ratings[:team_counts[i]]):
+            break
+        resume = i
+    return resume
+
+def incremental_replay(matches_df, initial_elos=None, home_advantage=100, default_elo=1500,
+                       checkpoint_every=10000, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Même résultat que replay_history(matches_df, ...), mais en ne rejouant que les
+    matchs situés après le dernier checkpoint valide. matches_df doit être trié par date.
+    """
+    initial_elos = initial_elos or {}
+    n_matches = len(matches_df)
+    arrays = prepare_replay_arrays(matches_df)
+    teams = arrays["teams"]
+    hashes = row_hashes(matches_df)
+    digest = params_digest(home_advantage, default_elo)
+
+    # IDs attribués par ordre d'apparition: un préfixe identique donne les mêmes IDs
+    initial_ratings = np.array([initial_elos.get(team, default_elo) for team in teams], dtype=np.float64)
+    ratings = initial_ratings.copy()
+
+    checkpoints = load_checkpoints(checkpoint_dir)
+    resume = find_resume_point(checkpoints, hashes, digest, initial_ratings)
+    history = {name: np.empty(n_matches, dtype=np.float64) for name in HISTORY_ARRAYS}
+
+    if resume > 0:
+        meta = checkpoints["meta"]
+        start = meta["positions"][resume]
+        team_count = meta["team_counts"][resume]
+        ratings[:team_count] = checkpoints["snapshots"][resume, :team_count]
+        for name in HISTORY_ARRAYS:
+            history[name][:start] = checkpoints[name][:start]
+        positions = meta["positions"][:resume + 1]
+        team_counts = meta["team_counts"][:resume + 1]
+        digests = meta["segment_digests"][:resume + 1]
+        snapshots = [np.array(checkpoints["snapshots"][i, :team_counts[i]]) for i in range(resume + 1)]
+        print(f"📁 Reprise du replay au match {start}/{n_matches}")
+    else:
+        start = 0
+        positions, team_counts, digests = [0], [0], [None]
+        snapshots = [ratings[:0].copy()]
+
+    # Rejouer le delta, segment par segment, en posant un checkpoint à chaque multiple
+    boundaries = list(range((start // checkpoint_every + 1) * checkpoint_every, n_matches, checkpoint_every))
+    if start < n_matches:
+        boundaries.append(n_matches)
+
+    first_seen = np.full(len(teams), n_matches, dtype=np.int64)
+    np.minimum.at(first_seen, arrays["home_ids"], np.arange(n_matches))
+    np.minimum.at(first_seen, arrays["away_ids"], np.arange(n_matches))
+
+    segment_start = start
+    for stop in boundaries:
+        segment = slice(segment_start, stop)
+        results = replay_arrays(
+            arrays["home_ids"][segment], arrays["away_ids"][segment],
+            arrays["home_goals"][segment], arrays["away_goals"][segment],
+            arrays["k_factors"][segment], ratings, home_advantage
+        )
+        for name, values in zip(HISTORY_ARRAYS, results):
+            history[name][segment] = values
+
+        team_count = int(np.count_nonzero(first_seen < stop))
+        positions.append(stop)
+        team_counts.append(team_count)
+        digests.append(segment_digest(hashes, segment_start, stop))
+        snapshots.append(ratings[:team_count].copy())
+        segment_start = stop
+
+    if boundaries:
+        snapshot_matrix = np.full((len(snapshots), len(teams)), np.nan, dtype=np.float64)
+        for i, snapshot in enumerate(snapshots):
+            snapshot_matrix[i, :len(snapshot)] = snapshot
+
+        last = matches_df.iloc[n_matches - 1]
+        save_checkpoints({
+            "meta": {
+                "version": CHECKPOINT_VERSION,
+                "params": digest,
+                "positions": positions,
+                "team_counts": team_counts,
+                "segment_digests": digests,
+                "last_match": {
+                    "date": str(last["MatchDate"]),
+                    "home_team": str(last["HomeTeam"]),
+                    "away_team": str(last["AwayTeam"]),
+                },
+            },
+            "teams": np.asarray(teams, dtype=np.str_),
+            "initial_ratings": initial_ratings,
+            "snapshots": snapshot_matrix,
+            **history,
+        }, checkpoint_dir)
+        print(f"💾 {n_matches - start} matchs rejoués, {len(positions) - 1} checkpoints")
+
+    rating_store = RatingStore(arrays["registry"], default_elo)
+    rating_store.set_ids(np.arange(len(teams)), ratings)
+
+    return {
+        "registry": arrays["registry"],
+        "teams": teams,
+        "ratings": ratings,
+        "rating_store": rating_store,
+        "home_ids": arrays["home_ids"],
+        "away_ids": arrays["away_ids"],
+        **history,
+        "resumed_from": start,
+    }
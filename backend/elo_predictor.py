@@ -1,14 +1,68 @@
 import pandas as pd
 import numpy as np
 
+from team_registry import RatingStore, TeamRegistry
+
 def load_data(matches_path, elo_path):
     matches_df = pd.read_csv(matches_path, low_memory=False)
     elo_df = pd.read_csv(elo_path)
     return matches_df, elo_df
 
-def get_k_factor(league_division, goal_difference, form_home, form_away):
+# League importance weights for the K-factor (example values, can be refined)
+LEAGUE_WEIGHTS = {
+    'E0': 1.2, # Premier League
+    'I1': 1.15, # Serie A
+    'SP1': 1.15, # La Liga
+    'D1': 1.1, # Bundesliga
+    'F1': 1.05, # Ligue 1
+    'P1': 1.0, # Liga Portugal
+    'N1': 0.95, # Eredivisie
+    'B1': 0.9, # Jupiler Pro League
+    'T1': 0.85, # Süper Lig
+    'SC0': 0.8, # Premiership écossaise
+    'G1': 0.75, # Super League grecque
+    'RUS': 0.7, # Premier Liga (Russia)
+    'AUT': 0.65, # Bundesliga (Austria)
+    'SUI': 0.6, # Super League (Switzerland)
+    'DEN': 0.55, # Superliga (Denmark)
+    'NOR': 0.5, # Eliteserien (Norway)
+    'SWE': 0.45, # Allsvenskan (Sweden)
+    # Add more leagues as needed
+}
+DEFAULT_LEAGUE_WEIGHT = 1.0 # Not a major league
+
+def league_weight_table(divisions, league_weights=LEAGUE_WEIGHTS):
+    # Weight per division code, aligned with a categorical's categories. The extra last
+    # entry is the default weight, so code -1 (missing division) indexes it directly
+    weights = [league_weights.get(division, DEFAULT_LEAGUE_WEIGHT) for division in divisions]
+    return np.array(weights + [DEFAULT_LEAGUE_WEIGHT], dtype=np.float64)
+
+def get_k_factors(division_codes, goal_difference, form_home, form_away, weight_table, base_k=30):
+    # Vectorized K-factor: same multipliers, applied in the same order, as the scalar version
+    goal_difference = np.asarray(goal_difference, dtype=np.float64)
+    form_home = np.asarray(form_home, dtype=np.float64)
+    form_away = np.asarray(form_away, dtype=np.float64)
+
     # Base K-factor
-    K_factor = 30
+    K_factors = np.full(len(goal_difference), base_k, dtype=np.float64)
+
+    # Adjust K-factor based on goal difference
+    K_factors *= np.where(goal_difference >= 3, 1.5, np.where(goal_difference == 2, 1.2, 1.0))
+
+    # Adjust K-factor based on league importance
+    K_factors *= weight_table[division_codes]
+
+    # Adjust K-factor based on recent form (both in good form: less volatile, both in bad form: more)
+    good_form = (form_home >= 7) & (form_away >= 7)
+    bad_form = (form_home <= 3) & (form_away <= 3)
+    K_factors *= np.where(good_form, 0.9, np.where(bad_form, 1.1, 1.0))
+
+    return K_factors
+
+def get_k_factor(league_division, goal_difference, form_home, form_away):
+    # Scalar path for one match (no arrays): same multipliers in the same order as
+    # get_k_factors, so both give bit-identical results
+    K_factor = 30.0
 
     # Adjust K-factor based on goal difference
     if goal_difference >= 3:
@@ -16,34 +70,13 @@ def get_k_factor(league_division, goal_difference, form_home, form_away):
     elif goal_difference == 2:
         K_factor *= 1.2
 
-    # Adjust K-factor based on league importance (example values, can be refined)
-    major_leagues = {
-        'E0': 1.2, # Premier League
-        'I1': 1.15, # Serie A
-        'SP1': 1.15, # La Liga
-        'D1': 1.1, # Bundesliga
-        'F1': 1.05, # Ligue 1
-        'P1': 1.0, # Liga Portugal
-        'N1': 0.95, # Eredivisie
-        'B1': 0.9, # Jupiler Pro League
-        'T1': 0.85, # Süper Lig
-        'SC0': 0.8, # Premiership écossaise
-        'G1': 0.75, # Super League grecque
-        'RUS': 0.7, # Premier Liga (Russia)
-        'AUT': 0.65, # Bundesliga (Austria)
-        'SUI': 0.6, # Super League (Switzerland)
-        'DEN': 0.55, # Superliga (Denmark)
-        'NOR': 0.5, # Eliteserien (Norway)
-        'SWE': 0.45, # Allsvenskan (Sweden)
-        # Add more leagues as needed
-    }
-    K_factor *= major_leagues.get(league_division, 1.0) # Default to 1.0 if not a major league
+    # Adjust K-factor based on league importance
+    K_factor *= LEAGUE_WEIGHTS.get(league_division, DEFAULT_LEAGUE_WEIGHT)
 
-    # Adjust K-factor based on recent form (example: if both teams are in good/bad form, less/more volatile)
-    # This is a simplified example, more complex logic can be applied
-    if form_home >= 7 and form_away >= 7: # Both in good form
+    # Adjust K-factor based on recent form
+    if form_home >= 7 and form_away >= 7:
         K_factor *= 0.9
-    elif form_home <= 3 and form_away <= 3: # Both in bad form
+    elif form_home <= 3 and form_away <= 3:
         K_factor *= 1.1
 
     return K_factor
@@ -64,31 +97,224 @@ def calculate_elo_change(elo_home, elo_away, score_home, score_away, K_factor, h
     change_away = K_factor * (S_away - expected_away)
     return change_home, change_away
 
-def calculate_probabilities(elo_diff, historical_matches_df):
-    elo_bin = round(elo_diff / 50) * 50
-    
-    matches_in_bin = historical_matches_df[
-        (historical_matches_df["elo_diff"] >= elo_bin - 25) & 
-        (historical_matches_df["elo_diff"] < elo_bin + 25)
-    ].copy() # Use .copy() to avoid SettingWithCopyWarning
-    
-    if len(matches_in_bin) == 0:
-        return None
-
-    total_matches = len(matches_in_bin)
-    prob_home_win = len(matches_in_bin[matches_in_bin["FTResult"] == "H"]) / total_matches
-    prob_draw = len(matches_in_bin[matches_in_bin["FTResult"] == "D"]) / total_matches
-    prob_away_win = len(matches_in_bin[matches_in_bin["FTResult"] == "A"]) / total_matches
-    
+def replay_arrays(home_ids, away_ids, home_goals, away_goals, k_factors, ratings, home_advantage=100):
+    # Sequential core of the replay: a match depends on the ratings left by the previous ones,
+    # so only this loop stays in Python. Everything it reads is precomputed as flat arrays.
+    # `ratings` is indexed by team ID and updated in place.
+    n_matches = len(home_ids)
+    home_elo_before = np.empty(n_matches, dtype=np.float64)
+    away_elo_before = np.empty(n_matches, dtype=np.float64)
+    home_elo_after = np.empty(n_matches, dtype=np.float64)
+    away_elo_after = np.empty(n_matches, dtype=np.float64)
+
+    # Plain Python floats in the loop: cheaper than NumPy scalars and bit-identical
+    # to what calculate_elo_change computes for a single match
+    elos = ratings.tolist()
+    rows = zip(home_ids.tolist(), away_ids.tolist(), home_goals.tolist(), away_goals.tolist(), k_factors.tolist())
+    for i, (home_id, away_id, score_home, score_away, K_factor) in enumerate(rows):
+        elo_home = elos[home_id]
+        elo_away = elos[away_id]
+        change_home, change_away = calculate_elo_change(
+            elo_home, elo_away, score_home, score_away, K_factor, home_advantage
+        )
+        elos[home_id] = elo_home + change_home
+        elos[away_id] = elo_away + change_away
+
+        home_elo_before[i] = elo_home
+        away_elo_before[i] = elo_away
+        home_elo_after[i] = elos[home_id]
+        away_elo_after[i] = elos[away_id]
+
+    ratings[:] = elos
+    return home_elo_before, away_elo_before, home_elo_after, away_elo_after
+
+def prepare_replay_arrays(matches_df, registry=None):
+    # Flattens the columns the replay reads into arrays aligned with the rows of matches_df
+
+    # Intern team names to dense integer IDs, in order of first appearance
+    registry = registry if registry is not None else TeamRegistry()
+    pairs = np.column_stack([matches_df["HomeTeam"].to_numpy(), matches_df["AwayTeam"].to_numpy()])
+    team_ids = registry.intern_many(pairs.ravel())
+
+    # A missing team gets ID -1, and elos[-1] would silently be the last team's rating
+    if len(team_ids) and team_ids.min() < 0:
+        missing_rows = np.flatnonzero((team_ids < 0).reshape(-1, 2).any(axis=1))
+        raise ValueError(
+            f"{len(missing_rows)} match(es) without HomeTeam/AwayTeam (first row: {missing_rows[0]}); "
+            "drop them before replaying"
+        )
+
+    home_goals = matches_df["FTHome"].to_numpy(dtype=np.float64)
+    away_goals = matches_df["FTAway"].to_numpy(dtype=np.float64)
+    form_home = np.nan_to_num(matches_df["Form5Home"].to_numpy(dtype=np.float64), nan=0.0)
+    form_away = np.nan_to_num(matches_df["Form5Away"].to_numpy(dtype=np.float64), nan=0.0)
+    goal_difference = np.abs(home_goals - away_goals)
+
+    division_codes, divisions = pd.factorize(matches_df["Division"])
+    k_factors = get_k_factors(division_codes, goal_difference, form_home, form_away, league_weight_table(divisions))
+
+    return {
+        "registry": registry,
+        "teams": registry.names,
+        "home_ids": team_ids[0::2],
+        "away_ids": team_ids[1::2],
+        "home_goals": home_goals,
+        "away_goals": away_goals,
+        "k_factors": k_factors,
+        # K-factor inputs, for callers that recompute k_factors with other weights
+        "goal_difference": goal_difference,
+        "form_home": form_home,
+        "form_away": form_away,
+        "division_codes": division_codes,
+        "divisions": list(divisions),
+    }
+
+def replay_history(matches_df, initial_elos=None, home_advantage=100, default_elo=1500, registry=None):
+    # Replays matches_df in its current row order (sort it by MatchDate first) and returns
+    # the ratings before/after every match as arrays aligned with the rows of matches_df.
+    # "ratings" is indexed by the team IDs of "registry"; "rating_store" wraps it by name
+    initial_elos = initial_elos or {}
+    arrays = prepare_replay_arrays(matches_df, registry)
+    teams = arrays["teams"]
+    ratings = np.array([initial_elos.get(team, default_elo) for team in teams], dtype=np.float64)
+
+    home_elo_before, away_elo_before, home_elo_after, away_elo_after = replay_arrays(
+        arrays["home_ids"], arrays["away_ids"], arrays["home_goals"], arrays["away_goals"],
+        arrays["k_factors"], ratings, home_advantage
+    )
+
+    rating_store = RatingStore(arrays["registry"], default_elo)
+    rating_store.set_ids(np.arange(len(teams)), ratings)
+
+    return {
+        "registry": arrays["registry"],
+        "teams": teams,
+        "ratings": ratings,
+        "rating_store": rating_store,
+        "home_ids": arrays["home_ids"],
+        "away_ids": arrays["away_ids"],
+        "home_elo_before": home_elo_before,
+        "away_elo_before": away_elo_before,
+        "home_elo_after": home_elo_after,
+        "away_elo_after": away_elo_after,
+    }
+
+def replay_stream(chunks, rating_store, initial_elos=None, home_advantage=100):
+    # Replays an iterable of date-ordered match chunks (see match_stream.iter_match_chunks)
+    # with bounded memory: only one chunk's arrays are alive at a time. rating_store carries
+    # the ratings from one chunk to the next and holds the final ratings at the end.
+    # Chunks must not contain rows without HomeTeam/AwayTeam (see prepare_replay_arrays).
+    # Yields each chunk with its before/after ratings.
+    initial_elos = initial_elos or {}
+    registry = rating_store.registry
+    ratings = rating_store.get_ids(np.arange(len(registry)))
+
+    for chunk in chunks:
+        known_teams = len(registry)
+        arrays = prepare_replay_arrays(chunk, registry)
+
+        # Teams seen for the first time in this chunk start from their initial rating
+        new_teams = registry.names[known_teams:]
+        if new_teams:
+            new_ratings = [initial_elos.get(team, rating_store.default_elo) for team in new_teams]
+            ratings = np.concatenate([ratings, np.array(new_ratings, dtype=np.float64)])
+
+        home_elo_before, away_elo_before, home_elo_after, away_elo_after = replay_arrays(
+            arrays["home_ids"], arrays["away_ids"], arrays["home_goals"], arrays["away_goals"],
+            arrays["k_factors"], ratings, home_advantage
+        )
+        rating_store.set_ids(np.arange(len(registry)), ratings)
+
+        yield chunk, {
+            "home_ids": arrays["home_ids"],
+            "away_ids": arrays["away_ids"],
+            "home_elo_before": home_elo_before,
+            "away_elo_before": away_elo_before,
+            "home_elo_after": home_elo_after,
+            "away_elo_after": away_elo_after,
+        }
+
+class ProbabilityIndex:
+    # History sorted by elo_diff with prefix sums of every outcome we price, so any
+    # [low, high) window is answered with two searchsorted calls instead of a scan
+    OUTCOMES = ("H", "D", "A", "over_2.5", "btts")
+
+    def __init__(self, historical_matches_df):
+        elo_diff = historical_matches_df["elo_diff"].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(elo_diff)
+        order = np.argsort(elo_diff[valid], kind="stable")
+
+        results = historical_matches_df["FTResult"].to_numpy()[valid][order]
+        home_goals = historical_matches_df["FTHome"].to_numpy(dtype=np.float64)[valid][order]
+        away_goals = historical_matches_df["FTAway"].to_numpy(dtype=np.float64)[valid][order]
+
+        outcomes = np.column_stack([
+            results == "H",
+            results == "D",
+            results == "A",
+            home_goals + away_goals > 2.5,
+            (home_goals > 0) & (away_goals > 0),
+        ])
+        self.elo_diffs = elo_diff[valid][order]
+        self.cumulative_counts = np.zeros((len(self.elo_diffs) + 1, len(self.OUTCOMES)), dtype=np.int64)
+        np.cumsum(outcomes, axis=0, out=self.cumulative_counts[1:])
+
+    def __len__(self):
+        return len(self.elo_diffs)
+
+    def window_counts(self, low, high):
+        # Number of matches with low <= elo_diff < high, and how many of them hit each outcome
+        start, stop = np.searchsorted(self.elo_diffs, [low, high], side="left")
+        return int(stop - start), self.cumulative_counts[stop] - self.cumulative_counts[start]
+
+    def query(self, elo_diff):
+        elo_bin = round(elo_diff / 50) * 50
+        total_matches, counts = self.window_counts(elo_bin - 25, elo_bin + 25)
+        if total_matches == 0:
+            return None
+        return _probabilities_from_counts(elo_bin, total_matches, counts.tolist())
+
+    def query_batch(self, elo_diffs):
+        # Vectorized query(): one entry per Elo difference, NaN where the bin is empty
+        elo_bins = np.round(np.asarray(elo_diffs, dtype=np.float64) / 50) * 50
+        starts = np.searchsorted(self.elo_diffs, elo_bins - 25, side="left")
+        stops = np.searchsorted(self.elo_diffs, elo_bins + 25, side="left")
+        totals = stops - starts
+        counts = self.cumulative_counts[stops] - self.cumulative_counts[starts]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = counts / np.where(totals > 0, totals, np.nan)[:, None]
+        prob_home_win, prob_draw, prob_away_win, prob_over_2_5, prob_btts_yes = rates.T
+
+        return {
+            "elo_diff_bin": elo_bins,
+            "total_matches_in_bin": totals,
+            "prob_home_win": prob_home_win,
+            "prob_draw": prob_draw,
+            "prob_away_win": prob_away_win,
+            "prob_home_or_draw": prob_home_win + prob_draw,
+            "prob_away_or_draw": prob_away_win + prob_draw,
+            "prob_home_or_away": prob_home_win + prob_away_win,
+            "prob_over_2.5": prob_over_2_5,
+            "prob_under_2.5": 1 - prob_over_2_5,
+            "prob_btts_yes": prob_btts_yes,
+            "prob_btts_no": 1 - prob_btts_yes,
+        }
+
+def _probabilities_from_counts(elo_bin, total_matches, counts):
+    home_wins, draws, away_wins, overs_2_5, btts_yes = counts
+    prob_home_win = home_wins / total_matches
+    prob_draw = draws / total_matches
+    prob_away_win = away_wins / total_matches
+
     prob_home_or_draw = prob_home_win + prob_draw
     prob_away_or_draw = prob_away_win + prob_draw
     prob_home_or_away = prob_home_win + prob_away_win
 
-    matches_in_bin["total_goals"] = matches_in_bin["FTHome"] + matches_in_bin["FTAway"]
-    prob_over_2_5 = len(matches_in_bin[matches_in_bin["total_goals"] > 2.5]) / total_matches
+    prob_over_2_5 = overs_2_5 / total_matches
     prob_under_2_5 = 1 - prob_over_2_5
 
-    prob_btts_yes = len(matches_in_bin[(matches_in_bin["FTHome"] > 0) & (matches_in_bin["FTAway"] > 0)]) / total_matches
+    prob_btts_yes = btts_yes / total_matches
     prob_btts_no = 1 - prob_btts_yes
 
     return {
@@ -106,78 +332,82 @@ def calculate_probabilities(elo_diff, historical_matches_df):
         "prob_btts_no": prob_btts_no,
     }
 
+def calculate_probabilities(elo_diff, historical_matches_df):
+    # Accepts the history DataFrame or a prebuilt ProbabilityIndex; build the index once
+    # and pass it in when answering more than one query
+    if not isinstance(historical_matches_df, ProbabilityIndex):
+        historical_matches_df = ProbabilityIndex(historical_matches_df)
+    return historical_matches_df.query(elo_diff)
+
+def calculate_probabilities_batch(elo_diffs, historical_matches_df):
+    # Columnar version of calculate_probabilities: one array per market, aligned with elo_diffs
+    if not isinstance(historical_matches_df, ProbabilityIndex):
+        historical_matches_df = ProbabilityIndex(historical_matches_df)
+    return historical_matches_df.query_batch(elo_diffs)
+
 if __name__ == "__main__":
+    from columnar_cache import load_matches_columnar, load_elo_ratings_columnar
+    from elo_checkpoints import incremental_replay
+    from rating_timeline import RatingTimeline
+    from probability_grid import KernelProbabilityGrid
+    from goal_model import GoalModel
+    from rating_bootstrap import bootstrap_ratings
+
     matches_path = "/home/ubuntu/data/Matches.csv"
     elo_path = "/home/ubuntu/data/EloRatings.csv"
-    matches_df, elo_df = load_data(matches_path, elo_path)
+    # Columnar cache: parsed, typed and sorted by MatchDate, rebuilt only when the CSV changes.
+    # Not match_stream: the checkpoints, timeline, grid and goal model below all need the full
+    # per-match history in memory anyway (replay_stream is for final ratings only)
+    matches_df = load_matches_columnar(matches_path)
+    elo_df = load_elo_ratings_columnar(elo_path)
 
-    current_elos = {}
-    all_teams = pd.concat([matches_df["HomeTeam"], matches_df["AwayTeam"]]).unique()
-    for team in all_teams:
-        current_elos[team] = elo_df[elo_df["club"] == team]["elo"].iloc[0] if team in elo_df["club"].values else 1500
+    # Each team starts from its published rating as of its first match (as-of join, no per-team scan)
+    current_elos = bootstrap_ratings(matches_df, elo_df)
 
     HOME_ADVANTAGE = 100
 
     matches_df_filtered = matches_df[matches_df["HomeTeam"].isin(current_elos.keys()) & 
                                      matches_df["AwayTeam"].isin(current_elos.keys())].copy()
 
-    matches_df_filtered["MatchDate"] = pd.to_datetime(matches_df_filtered["MatchDate"])
-    matches_df_filtered = matches_df_filtered.sort_values(by="MatchDate")
-
-    updated_elos_history = []
-
-    # Calculate form for each team before processing matches
-    team_form = {}
-    for team in all_teams:
-        team_form[team] = {"last_3": 0, "last_5": 0}
-
-    for index, row in matches_df_filtered.iterrows():
-        home_team = row["HomeTeam"]
-        away_team = row["AwayTeam"]
-        ft_home_goals = row["FTHome"]
-        ft_away_goals = row["FTAway"]
-        division = row["Division"]
-
-        elo_home = current_elos.get(home_team, 1500)
-        elo_away = current_elos.get(away_team, 1500)
-
-        # Get form for current match
-        form_home = row["Form5Home"] if pd.notna(row["Form5Home"]) else 0
-        form_away = row["Form5Away"] if pd.notna(row["Form5Away"]) else 0
-
-        K_FACTOR_DYNAMIC = get_k_factor(division, abs(ft_home_goals - ft_away_goals), form_home, form_away)
-
-        change_home, change_away = calculate_elo_change(
-            elo_home, elo_away, ft_home_goals, ft_away_goals, K_FACTOR_DYNAMIC, HOME_ADVANTAGE
-        )
-
-        current_elos[home_team] = elo_home + change_home
-        current_elos[away_team] = elo_away + change_away
-
-        updated_elos_history.append({
-            "date": row["MatchDate"],
-            "home_team": home_team,
-            "away_team": away_team,
-            "home_elo_before": elo_home,
-            "away_elo_before": elo_away,
-            "home_elo_after": current_elos[home_team],
-            "away_elo_after": current_elos[away_team],
-            "FTHome": ft_home_goals, 
-            "FTAway": ft_away_goals, 
-            "FTResult": row["FTResult"] 
-        })
-
-    updated_elos_df = pd.DataFrame(updated_elos_history)
+    # Only the matches after the last valid checkpoint are actually replayed
+    replay = incremental_replay(matches_df_filtered, current_elos, HOME_ADVANTAGE)
+    current_elos.update(zip(replay["teams"], replay["ratings"].tolist()))
+
+    # Per-team rating history, so later lookups by date never need a replay
+    RatingTimeline.from_replay(replay, matches_df_filtered["MatchDate"]).save()
+
+    updated_elos_df = pd.DataFrame({
+        "date": matches_df_filtered["MatchDate"].to_numpy(),
+        "home_team": matches_df_filtered["HomeTeam"].to_numpy(),
+        "away_team": matches_df_filtered["AwayTeam"].to_numpy(),
+        "home_elo_before": replay["home_elo_before"],
+        "away_elo_before": replay["away_elo_before"],
+        "home_elo_after": replay["home_elo_after"],
+        "away_elo_after": replay["away_elo_after"],
+        "FTHome": matches_df_filtered["FTHome"].to_numpy(),
+        "FTAway": matches_df_filtered["FTAway"].to_numpy(),
+        "FTResult": matches_df_filtered["FTResult"].to_numpy(),
+    })
     updated_elos_df["elo_diff"] = updated_elos_df["home_elo_before"] - updated_elos_df["away_elo_before"]
 
     elo_difference_to_predict = 150
-    probabilities = calculate_probabilities(elo_difference_to_predict, updated_elos_df)
+    probability_index = ProbabilityIndex(updated_elos_df)
+    # Smoothed estimator on a fine grid, saved so the server never loads the history
+    KernelProbabilityGrid.fit(updated_elos_df).save()
+    # Poisson / Dixon-Coles goal model: score matrices per Elo bucket for any goal line
+    goal_model = GoalModel.fit(updated_elos_df)
+    goal_model.save()
+    probabilities = calculate_probabilities(elo_difference_to_predict, probability_index)
 
     if probabilities:
         print(f"\nProbabilities for ELO difference around {elo_difference_to_predict}:")
         for key, value in probabilities.items():
             print(f"{key}: {value:.4f}")
 
+    print(f"\nGoal markets for ELO difference {elo_difference_to_predict}:")
+    for key, value in goal_model.markets(elo_difference_to_predict).items():
+        print(f"{key}: {value:.4f}")
+
     print("\nFinal ELOs for a few teams:")
     print(f'Real Madrid ELO: {current_elos.get("Real Madrid", "N/A")}')
     print(f'Barcelona ELO: {current_elos.get("Barcelona", "N/A")}')
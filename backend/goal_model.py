@@ -0,0 +1,202 @@
+"""
+Modèle de buts Poisson / Dixon-Coles en fonction de l'écart ELO
+
+Les buts domicile et extérieur suivent chacun une loi de Poisson dont le log
+de la moyenne est linéaire en l'écart ELO (ajusté par Newton sur FTHome /
+FTAway). La correction de Dixon-Coles (paramètre rho) redistribue la masse
+des scores 0-0, 1-0, 0-1 et 1-1.
+
+Les matrices de scores sont précalculées une fois par tranche d'écart ELO,
+avec la distribution du total de buts et la probabilité BTTS: un marché
+over/under sur n'importe quelle ligne, BTTS ou score exact est une lecture de
+table suivie d'une petite somme. Sauvegardable en .npz comme la grille de
+probabilités.
+"""
+
+import numpy as np
+
+GOAL_MODEL_PATH = "data/goal_model.npz"
+MAX_GOALS = 10
+ELO_SCALE = 400.0  # les coefficients sont exprimés par tranche de 400 points
+
+def fit_poisson_log_linear(x, goals, iterations=25, tolerance=1e-10):
+    """Régression de Poisson log λ = a + b·x par Newton-Raphson; retourne (a, b)"""
+    design = np.column_stack([np.ones(len(x)), x])
+    coefficients = np.array([np.log(max(goals.mean(), 1e-6)), 0.0])
+    for _ in range(iterations):
+        rates = np.exp(design @ coefficients)
+        gradient = design.T @ (goals - rates)
+        hessian = (design * rates[:, None]).T @ design
+        step = np.linalg.solve(hessian, gradient)
+        coefficients += step
+        if np.max(np.abs(step)) < tolerance:
+            break
+    return coefficients
+
+def poisson_pmf(rates, max_goals=MAX_GOALS):
+    """P(X = k) pour k = 0..max_goals, une ligne par moyenne: (len(rates), max_goals + 1)"""
+    rates = np.asarray(rates, dtype=np.float64)[:, None]
+    k = np.arange(max_goals + 1)
+    log_factorials = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max_goals + 1)))])
+    return np.exp(k * np.log(rates) - rates - log_factorials)
+
+def dixon_coles_tau(home_goals, away_goals, home_rates, away_rates, rho):
+    """Facteur de correction de Dixon-Coles (1 hors des scores 0-0, 1-0, 0-1, 1-1)"""
+    tau = np.ones(np.broadcast(home_goals, away_goals, home_rates, away_rates, rho).shape)
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - home_rates * away_rates * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + home_rates * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + away_rates * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+    return tau
+
+def fit_rho(home_goals, away_goals, home_rates, away_rates, rho_grid=np.linspace(-0.3, 0.3, 121)):
+    """rho maximisant la vraisemblance des scores faibles, moyennes fixées (recherche sur grille)"""
+    low = (home_goals <= 1) & (away_goals <= 1)
+    tau = dixon_coles_tau(
+        home_goals[low][None, :], away_goals[low][None, :],
+        home_rates[low][None, :], away_rates[low][None, :], rho_grid[:, None]
+    )
+    valid = (tau > 0).all(axis=1)
+    if not valid.any():
+        return 0.0
+    log_likelihood = np.where(valid, np.log(np.maximum(tau, 1e-300)).sum(axis=1), -np.inf)
+    return float(rho_grid[np.argmax(log_likelihood)])
+
+class GoalModel:
+    def __init__(self, buckets, home_coefficients, away_coefficients, rho, max_goals=MAX_GOALS):
+        self.buckets = buckets  # centres des tranches d'écart ELO, pas constant
+        self.home_coefficients = home_coefficients
+        self.away_coefficients = away_coefficients
+        self.rho = rho
+        self.max_goals = max_goals
+        self.bucket_width = float(buckets[1] - buckets[0]) if len(buckets) > 1 else 1.0
+
+        # Précalcul par tranche: matrice des scores, distribution du total, BTTS, 1/X/2
+        self.home_rates, self.away_rates = self.expected_goals(buckets)
+        self.score_matrices = self._score_matrices(self.home_rates, self.away_rates)
+        n_goals = max_goals + 1
+        totals = np.add.outer(np.arange(n_goals), np.arange(n_goals)).ravel()
+        self.total_goals = np.stack([
+            np.bincount(totals, weights=matrix.ravel(), minlength=2 * n_goals - 1)
+            for matrix in self.score_matrices
+        ])
+        self.cumulative_total_goals = np.cumsum(self.total_goals, axis=1)
+        self.btts = self.score_matrices[:, 1:, 1:].sum(axis=(1, 2))
+        home_ahead = np.tril(np.ones((n_goals, n_goals)), -1)
+        self.outcomes = np.stack([
+            (self.score_matrices * home_ahead).sum(axis=(1, 2)),
+            np.trace(self.score_matrices, axis1=1, axis2=2),
+            (self.score_matrices * home_ahead.T).sum(axis=(1, 2)),
+        ], axis=1)
+
+    @classmethod
+    def fit(cls, historical_matches_df, bucket_width=25.0, bucket_limit=800.0, max_goals=MAX_GOALS):
+        """Ajuste le modèle sur l'historique (colonnes elo_diff, FTHome, FTAway)"""
+        elo_diff = historical_matches_df["elo_diff"].to_numpy(dtype=np.float64)
+        home_goals = historical_matches_df["FTHome"].to_numpy(dtype=np.float64)
+        away_goals = historical_matches_df["FTAway"].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(elo_diff) & ~np.isnan(home_goals) & ~np.isnan(away_goals)
+        x = np.clip(elo_diff[valid], -bucket_limit, bucket_limit) / ELO_SCALE
+        home_goals, away_goals = home_goals[valid], away_goals[valid]
+
+        home_coefficients = fit_poisson_log_linear(x, home_goals)
+        away_coefficients = fit_poisson_log_linear(x, away_goals)
+        home_rates = np.exp(home_coefficients[0] + home_coefficients[1] * x)
+        away_rates = np.exp(away_coefficients[0] + away_coefficients[1] * x)
+        rho = fit_rho(home_goals, away_goals, home_rates, away_rates)
+
+        buckets = np.arange(-bucket_limit, bucket_limit + bucket_width / 2, bucket_width)
+        return cls(buckets, home_coefficients, away_coefficients, rho, max_goals)
+
+    def expected_goals(self, elo_diffs):
+        """Buts attendus (domicile, extérieur) pour un tableau d'écarts ELO"""
+        x = np.asarray(elo_diffs, dtype=np.float64) / ELO_SCALE
+        return (np.exp(self.home_coefficients[0] + self.home_coefficients[1] * x),
+                np.exp(self.away_coefficients[0] + self.away_coefficients[1] * x))
+
+    def _score_matrices(self, home_rates, away_rates):
+        n_goals = self.max_goals + 1
+        matrices = poisson_pmf(home_rates, self.max_goals)[:, :, None] * poisson_pmf(away_rates, self.max_goals)[:, None, :]
+        goals = np.arange(n_goals)
+        tau = dixon_coles_tau(
+            goals[None, :, None], goals[None, None, :],
+            home_rates[:, None, None], away_rates[:, None, None], self.rho
+        )
+        matrices = np.maximum(matrices * tau, 0)
+        # Renormalisation: troncature à max_goals et correction de Dixon-Coles
+        return matrices / matrices.sum(axis=(1, 2), keepdims=True)
+
+    def bucket_index(self, elo_diffs):
+        """Indice de la tranche la plus proche (écarts hors grille ramenés aux bords)"""
+        positions = np.rint((np.asarray(elo_diffs, dtype=np.float64) - self.buckets[0]) / self.bucket_width)
+        return np.clip(positions, 0, len(self.buckets) - 1).astype(np.intp)
+
+    def score_matrix(self, elo_diff):
+        """Matrice P(domicile = i, extérieur = j) pour un écart ELO"""
+        return self.score_matrices[self.bucket_index(elo_diff)]
+
+    def over_probability_batch(self, elo_diffs, line):
+        """P(total de buts > line) pour un tableau d'écarts ELO, ligne en x.5"""
+        threshold = int(np.floor(line))
+        cumulative = self.cumulative_total_goals[self.bucket_index(elo_diffs)]
+        if threshold < 0:
+            return np.ones(cumulative.shape[0])
+        return 1 - cumulative[:, min(threshold, cumulative.shape[1] - 1)]
+
+    def btts_probability_batch(self, elo_diffs):
+        """P(les deux équipes marquent) pour un tableau d'écarts ELO"""
+        return self.btts[self.bucket_index(elo_diffs)]
+
+    def correct_score_probability(self, elo_diff, home_goals, away_goals):
+        """P(score exact); 0 au-delà de max_goals"""
+        if home_goals > self.max_goals or away_goals > self.max_goals:
+            return 0.0
+        return float(self.score_matrix(elo_diff)[home_goals, away_goals])
+
+    def most_likely_scores(self, elo_diff, n=5):
+        """Les n scores exacts les plus probables: [(domicile, extérieur, probabilité), ...]"""
+        matrix = self.score_matrix(elo_diff)
+        flat = np.argsort(matrix.ravel())[::-1][:n]
+        home, away = np.unravel_index(flat, matrix.shape)
+        return [(int(h), int(a), float(matrix[h, a])) for h, a in zip(home, away)]
+
+    def markets(self, elo_diff, lines=(0.5, 1.5, 2.5, 3.5, 4.5)):
+        """Marchés de buts pour un écart ELO (clés au format over_2_5 / under_2_5, btts_yes...)"""
+        bucket = int(self.bucket_index(elo_diff))
+        home_win, draw, away_win = self.outcomes[bucket]
+        markets = {
+            "expected_home_goals": float(self.home_rates[bucket]),
+            "expected_away_goals": float(self.away_rates[bucket]),
+            "home_win": float(home_win),
+            "draw": float(draw),
+            "away_win": float(away_win),
+            "btts_yes": float(self.btts[bucket]),
+            "btts_no": float(1 - self.btts[bucket]),
+        }
+        for line in lines:
+            over = float(self.over_probability_batch([elo_diff], line)[0])
+            suffix = str(line).replace(".", "_")
+            markets[f"over_{suffix}"] = over
+            markets[f"under_{suffix}"] = 1 - over
+        return markets
+
+    def save(self, path=GOAL_MODEL_PATH):
+        np.savez(
+            path,
+            buckets=self.buckets,
+            home_coefficients=self.home_coefficients,
+            away_coefficients=self.away_coefficients,
+            rho=np.float64(self.rho),
+            max_goals=np.int64(self.max_goals),
+        )
+
+    @classmethod
+    def load(cls, path=GOAL_MODEL_PATH):
+        with np.load(path) as data:
+            return cls(
+                data["buckets"],
+                data["home_coefficients"],
+                data["away_coefficients"],
+                float(data["rho"]),
+                int(data["max_goals"]),
+            )
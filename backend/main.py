@@ -15,6 +15,7 @@ import numpy as np
 from efficient_data_manager import EfficientDataManager
 from team_name_mapping import TeamNameMapper
 from elo_predictor import calculate_probabilities
+from probability_grid import GRID_PATH, KernelProbabilityGrid
 import threading
 import time
 import schedule
@@ -33,17 +34,33 @@ team_mapper = None
 last_update = None
 current_matches = []
 api_stats = {"daily_calls": 0, "max_calls": 35000}
+probability_grid = None
+
+def load_probability_grid(path=GRID_PATH):
+    """Charge la grille de probabilités lissées si elle a été précalculée"""
+    global probability_grid
+    if os.path.exists(path):
+        probability_grid = KernelProbabilityGrid.load(path)
+        logger.info(f"📁 Grille de probabilités chargée: {path}")
+    else:
+        logger.info("ℹ️ Pas de grille de probabilités précalculée")
 
 def init_app():
     """Initialisation de l'application"""
     global data_manager, team_mapper, last_update
     
+    load_probability_grid()
+    
     try:
         # Récupérer la clé API depuis les variables d'environnement
         api_key = os.environ.get('RAPIDAPI_KEY', 'e1e76b8e3emsh2445ffb97db0128p158afdjsnb3175ce8d916')
         
         # Initialiser le gestionnaire de données
-        data_manager = EfficientDataManager(api_key)
+        # Serveur longue durée: cache de matchs périmé servi pendant le rafraîchissement en arrière-plan,
+        # dont le résultat est ensuite publié dans current_matches
+        data_manager = EfficientDataManager(
+            api_key, stale_while_revalidate=True, on_fixtures_refreshed=on_fixtures_refreshed
+        )
         team_mapper = TeamNameMapper()
         team_mapper.load_mapping_cache()
         
@@ -129,27 +146,36 @@ def start_scheduler():
     scheduler_thread.start()
     logger.info("🤖 Planificateur automatique démarré")
 
-def morning_update():
-    """Mise à jour matinale - récupération des matchs du jour"""
+def publish_matches(matches):
+    """Calcule les prédictions et remplace les matchs servis par /api/today-matches"""
     global current_matches, last_update
     
+    # Calculer les prédictions
+    for match in matches:
+        predictions = calculate_match_predictions(match)
+        match["predictions"] = predictions
+    
+    current_matches = matches
+    last_update = datetime.now()
+    
+    # Sauvegarder
+    save_daily_predictions(matches)
+    logger.info(f"✅ {len(matches)} matchs mis à jour")
+
+def on_fixtures_refreshed(date, matches):
+    """Fin d'un rafraîchissement en arrière-plan: publie les matchs s'ils concernent aujourd'hui"""
+    if matches and date == datetime.now().strftime("%Y-%m-%d"):
+        publish_matches(matches)
+
+def morning_update(allow_stale=True):
+    """Mise à jour matinale - récupération des matchs du jour"""
     try:
         if data_manager:
             logger.info("🌅 Mise à jour matinale en cours...")
-            matches = data_manager.get_today_fixtures_smart()
+            matches = data_manager.get_today_fixtures_smart(allow_stale=allow_stale)
             
             if matches:
-                # Calculer les prédictions
-                for match in matches:
-                    predictions = calculate_match_predictions(match)
-                    match["predictions"] = predictions
-                
-                current_matches = matches
-                last_update = datetime.now()
-                
-                # Sauvegarder
-                save_daily_predictions(matches)
-                logger.info(f"✅ {len(matches)} matchs mis à jour")
+                publish_matches(matches)
             else:
                 logger.info("ℹ️ Aucun match trouvé pour aujourd'hui")
                 
@@ -168,7 +194,8 @@ def evening_update():
             logger.info("🌙 Mise à jour du soir en cours...")
             # Récupérer les résultats d'hier et mettre à jour les ELO
             yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-            results = data_manager.get_today_fixtures_smart(yesterday)
+            # Résultats définitifs nécessaires: pas de cache périmé
+            results = data_manager.get_today_fixtures_smart(yesterday, allow_stale=False)
             
             if results:
                 finished_matches = [m for m in results if m.get("finished", False)]
@@ -198,7 +225,11 @@ def calculate_match_predictions(match):
         elo_diff = home_elo - away_elo
         
         # Utiliser notre système de calcul de probabilités
-        probs = calculate_probabilities(elo_diff)
+        # Grille lissée précalculée si disponible (pas d'historique en mémoire)
+        if probability_grid is not None:
+            probs = probability_grid.match_probabilities(elo_diff)
+        else:
+            probs = calculate_probabilities(elo_diff)
         
         # Déterminer le meilleur pari
         best_bet = determine_best_bet(probs)
@@ -293,7 +324,7 @@ def get_today_matches():
 def refresh_data():
     """Force une mise à jour des données"""
     try:
-        morning_update()
+        morning_update(allow_stale=False)
         return jsonify({
             "success": True,
             "message": "Données mises à jour",
@@ -308,9 +339,9 @@ def refresh_data():
 
 @app.route('/api/stats')
 def get_stats():
-    """Statistiques de l'API"""
+    """Statistiques de l'API (compteurs du cache et latences lus en direct)"""
     return jsonify({
-        "api_usage": api_stats,
+        "api_usage": data_manager.get_api_usage_stats() if data_manager else api_stats,
         "last_update": last_update.isoformat() if last_update else None,
         "matches_today": len(current_matches),
         "system_status": "operational" if data_manager else "fallback"
@@ -320,13 +351,9 @@ def get_stats():
 def get_top_teams():
     """Top des équipes par ELO"""
     try:
-        if data_manager and hasattr(data_manager, 'current_elos'):
-            # Trier les équipes par ELO
-            sorted_teams = sorted(
-                data_manager.current_elos.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:20]  # Top 20
+        if data_manager and hasattr(data_manager, 'ratings'):
+            # Top 20 calculé sur le tableau des ELO, noms résolus seulement ici
+            sorted_teams = data_manager.ratings.top(20)
             
             return jsonify({
                 "success": True,
@@ -0,0 +1,150 @@
+"""
+Lecture de Matches.csv par blocs, à mémoire bornée
+
+Seules les colonnes du replay sont lues (usecols + dtypes explicites), par
+blocs de taille fixe: la mémoire occupée dépend de la taille d'un bloc, pas
+de celle du fichier. Les blocs sont fournis au moteur ELO dans l'ordre des
+dates, même si le CSV n'est pas trié (tri externe: chaque bloc est trié et
+écrit sur disque, puis les blocs sont fusionnés par MatchDate avec un tas).
+
+Reste optionnel (replay_stream) pour les usages qui n'ont besoin que des ELO
+finaux. La reconstruction complète d'elo_predictor garde load_matches_columnar:
+checkpoints (empreinte de chaque ligne), RatingTimeline, ProbabilityIndex,
+grille et modèle de buts consomment tout l'historique match par match, qui
+serait de toute façon entièrement en mémoire.
+"""
+
+import heapq
+import itertools
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import MATCH_COLUMNS, MATCH_DTYPES
+
+DEFAULT_CHUNKSIZE = 200_000
+DEFAULT_MERGE_BLOCK = 10_000  # lignes relues à la fois dans chaque bloc trié pendant la fusion
+DEFAULT_FAN_IN = 16  # blocs triés fusionnés en même temps (au-delà: fusions intermédiaires)
+
+# Pendant le tri, un bloc est un dict {colonne: tableau NumPy}: découper et recoller des
+# tranches de quelques lignes y coûte bien moins cher qu'avec des DataFrames
+
+def _columns(frame):
+    return {column: frame[column].to_numpy() for column in frame.columns}
+
+def _length(block):
+    return len(block["MatchDate"])
+
+def _slice(block, start, stop=None):
+    return {column: values[start:stop] for column, values in block.items()}
+
+def _concat(blocks):
+    return {column: np.concatenate([block[column] for block in blocks]) for column in blocks[0]}
+
+def _write_run(blocks, path, block_size):
+    """Écrit un flux de blocs triés sur disque, en sous-blocs relisibles un par un"""
+    with open(path, "wb") as f:
+        for block in blocks:
+            for start in range(0, _length(block), block_size):
+                pickle.dump(_slice(block, start, start + block_size), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def _rechunk(blocks, chunksize):
+    """Regroupe un flux de tranches en blocs de exactement `chunksize` lignes (sauf le dernier)"""
+    pending, size = [], 0
+    for block in blocks:
+        if not _length(block):
+            continue
+        pending.append(block)
+        size += _length(block)
+        while size >= chunksize:
+            merged = _concat(pending)
+            yield _slice(merged, 0, chunksize)
+            rest = _slice(merged, chunksize)
+            pending, size = ([rest] if _length(rest) else []), _length(rest)
+    if pending:
+        yield _concat(pending)
+
+def _merge_runs(run_paths):
+    """
+    Fusion k-voies par tas des blocs triés: tranches de lignes dans l'ordre (MatchDate,
+    rang du bloc dans le fichier), soit le même ordre qu'un tri stable global.
+    Mémoire: un sous-bloc par bloc trié.
+    """
+    runs = [_read_run(path) for path in run_paths]
+    buffers = [next(run, None) for run in runs]
+    heap = [(buffer["MatchDate"][0], i) for i, buffer in enumerate(buffers) if buffer is not None]
+    heapq.heapify(heap)
+
+    while heap:
+        _, i = heapq.heappop(heap)
+        buffer = buffers[i]
+        if heap:
+            # Tout ce qui précède la tête suivante; à date égale, le bloc situé plus tôt dans le fichier d'abord
+            next_date, next_run = heap[0]
+            side = "right" if i < next_run else "left"
+            cut = int(np.searchsorted(buffer["MatchDate"], next_date, side=side))
+        else:
+            cut = _length(buffer)
+        yield _slice(buffer, 0, cut)
+
+        rest = _slice(buffer, cut)
+        buffers[i] = rest if _length(rest) else next(runs[i], None)
+        if buffers[i] is not None:
+            heapq.heappush(heap, (buffers[i]["MatchDate"][0], i))
+
+def iter_match_chunks(matches_path, chunksize=DEFAULT_CHUNKSIZE, usecols=MATCH_COLUMNS, dtypes=MATCH_DTYPES,
+                      merge_block=DEFAULT_MERGE_BLOCK, fan_in=DEFAULT_FAN_IN, tmp_dir=None):
+    """
+    Itère sur Matches.csv par blocs de `chunksize` lignes, dans l'ordre de MatchDate (tri
+    stable: à date égale, l'ordre du fichier est conservé; les lignes sans date viennent
+    en dernier).
+
+    Mémoire bornée quelle que soit la taille du fichier: un bloc de lecture, puis au plus
+    `fan_in` sous-blocs de `merge_block` lignes et un bloc de sortie pendant la fusion.
+    Les blocs triés intermédiaires vont dans `tmp_dir`.
+    """
+    reader = pd.read_csv(matches_path, usecols=usecols, dtype=dtypes, chunksize=chunksize)
+
+    with tempfile.TemporaryDirectory(prefix="match_runs_", dir=tmp_dir) as run_dir:
+        # 1. Blocs triés écrits sur disque; lignes sans date mises de côté pour la fin
+        run_paths, undated_paths = [], []
+        for i, chunk in enumerate(reader):
+            chunk["MatchDate"] = pd.to_datetime(chunk["MatchDate"])
+            undated = chunk["MatchDate"].isna()
+            if undated.any():
+                undated_paths.append(os.path.join(run_dir, f"undated_{i}.pkl"))
+                _write_run([_columns(chunk[undated])], undated_paths[-1], merge_block)
+                chunk = chunk[~undated]
+            if len(chunk):
+                run_paths.append(os.path.join(run_dir, f"run_{i}.pkl"))
+                _write_run([_columns(chunk.sort_values(by="MatchDate", kind="stable"))], run_paths[-1], merge_block)
+
+        # 2. Plus de fan_in blocs: fusions intermédiaires par groupes consécutifs (l'ordre du fichier est gardé)
+        generation = 0
+        while len(run_paths) > fan_in:
+            merged_paths = []
+            for start in range(0, len(run_paths), fan_in):
+                group = run_paths[start:start + fan_in]
+                merged_paths.append(os.path.join(run_dir, f"merge_{generation}_{start}.pkl"))
+                _write_run(_rechunk(_merge_runs(group), merge_block), merged_paths[-1], merge_block)
+                for path in group:
+                    os.remove(path)
+            run_paths = merged_paths
+            generation += 1
+
+        # 3. Fusion finale, puis les lignes sans date, en blocs de taille fixe
+        undated_blocks = itertools.chain.from_iterable(_read_run(path) for path in undated_paths)
+        for block in _rechunk(itertools.chain(_merge_runs(run_paths), undated_blocks), chunksize):
+            frame = pd.DataFrame(block)
+            yield frame.astype({column: dtype for column, dtype in dtypes.items() if column in frame.columns})
@@ -0,0 +1,186 @@
+"""
+Recherche de paramètres ELO (avantage domicile, K de base, poids des ligues)
+
+Les tableaux du replay sont préparés une seule fois puis placés en mémoire
+partagée: chaque processus du pool y accède en lecture seule, sans copie ni
+re-sérialisation. Chaque combinaison de paramètres rejoue tout l'historique,
+calibre les probabilités sur les saisons d'entraînement et est évaluée
+(log-loss, Brier) sur les saisons mises de côté.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from elo_predictor import (
+    LEAGUE_WEIGHTS, ProbabilityIndex, get_k_factors, league_weight_table, prepare_replay_arrays, replay_arrays
+)
+from scoring import brier_score, encode_results, log_loss, one_hot
+
+DEFAULT_GRID = {
+    "home_advantage": [50, 75, 100, 125],
+    "base_k": [20, 25, 30, 35, 40],
+    "league_weight_scale": [0.0, 0.5, 1.0],
+}
+
+def season_of(dates):
+    """Saison (année de début) d'un tableau de dates: saisons août-mai"""
+    dates = pd.DatetimeIndex(dates)
+    return np.where(dates.month >= 7, dates.year, dates.year - 1).astype(np.int32)
+
+def build_sweep_arrays(matches_df, initial_elos=None, default_elo=1500):
+    """Prépare une fois les tableaux partagés par tous les replays (matches_df trié par date)"""
+    initial_elos = initial_elos or {}
+    # Une équipe manquante n'aurait pas d'ID valide: le replay lirait elos[-1]
+    matches_df = matches_df.dropna(subset=["HomeTeam", "AwayTeam"])
+    replay = prepare_replay_arrays(matches_df)
+
+    names = ["home_ids", "away_ids", "home_goals", "away_goals", "goal_difference",
+             "form_home", "form_away", "division_codes"]
+    arrays = {name: replay[name] for name in names}
+    arrays.update({
+        "results": encode_results(matches_df["FTResult"].to_numpy()),
+        "seasons": season_of(matches_df["MatchDate"]),
+        "initial_ratings": np.array([initial_elos.get(t, default_elo) for t in replay["teams"]], dtype=np.float64),
+    })
+    return arrays, replay["divisions"]
+
+class SharedArrays:
+    """Tableaux NumPy placés en mémoire partagée (propriétaire: le processus parent)"""
+
+    def __init__(self, arrays):
+        self.blocks = {}
+        self.descriptors = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+            self.blocks[name] = block
+            self.descriptors[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# État des processus du pool (attaché une fois par processus par _init_worker)
+_worker = {}
+
+def _attach(descriptors):
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in descriptors.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        blocks.append(block)
+        arrays[name] = array
+    return blocks, arrays
+
+def _init_worker(descriptors, divisions, holdout_seasons):
+    blocks, arrays = _attach(descriptors)
+    _worker.update(blocks=blocks, arrays=arrays, divisions=divisions, holdout_seasons=holdout_seasons)
+
+def evaluate_params(arrays, divisions, holdout_seasons, home_advantage=100, base_k=30, league_weight_scale=1.0):
+    """Rejoue l'historique avec ces paramètres et évalue les prédictions 1X2 sur les saisons test"""
+    started = time.perf_counter()
+
+    weights = {division: weight ** league_weight_scale for division, weight in LEAGUE_WEIGHTS.items()}
+    k_factors = get_k_factors(
+        arrays["division_codes"], arrays["goal_difference"], arrays["form_home"], arrays["form_away"],
+        league_weight_table(divisions, weights), base_k
+    )
+    ratings = arrays["initial_ratings"].copy()
+    home_before, away_before, _, _ = replay_arrays(
+        arrays["home_ids"], arrays["away_ids"], arrays["home_goals"], arrays["away_goals"],
+        k_factors, ratings, home_advantage
+    )
+    elo_diff = home_before - away_before
+
+    # Calibration sur les saisons antérieures à la première saison test
+    seasons = arrays["seasons"]
+    results = arrays["results"]
+    known = results >= 0
+    test = np.isin(seasons, holdout_seasons) & known
+    train = (seasons < min(holdout_seasons)) & known
+
+    index = ProbabilityIndex(pd.DataFrame({
+        "elo_diff": elo_diff[train],
+        "FTResult": np.array(["H", "D", "A"])[results[train]],
+        "FTHome": arrays["home_goals"][train],
+        "FTAway": arrays["away_goals"][train],
+    }))
+    predicted = index.query_batch(elo_diff[test])
+    probabilities = np.column_stack([predicted["prob_home_win"], predicted["prob_draw"], predicted["prob_away_win"]])
+
+    # Bins vides: fréquences globales de l'entraînement
+    base_rates = np.bincount(results[train], minlength=3) / max(np.count_nonzero(train), 1)
+    empty = np.isnan(probabilities).any(axis=1)
+    probabilities[empty] = base_rates
+
+    outcomes = one_hot(results[test])
+    return {
+        "home_advantage": home_advantage,
+        "base_k": base_k,
+        "league_weight_scale": league_weight_scale,
+        "log_loss": log_loss(probabilities, outcomes),
+        "brier": brier_score(probabilities, outcomes),
+        "test_matches": int(np.count_nonzero(test)),
+        "empty_bins": int(np.count_nonzero(empty)),
+        "seconds": time.perf_counter() - started,
+    }
+
+def _evaluate_in_worker(params):
+    return evaluate_params(_worker["arrays"], _worker["divisions"], _worker["holdout_seasons"], **params)
+
+def param_grid(grid):
+    """Produit cartésien d'une grille {nom: [valeurs]} -> liste de dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_sweep(matches_df, holdout_seasons, grid=None, initial_elos=None, max_workers=None):
+    """Évalue toutes les combinaisons de la grille en parallèle, classées par log-loss puis Brier"""
+    grid = grid or DEFAULT_GRID
+    candidates = param_grid(grid)
+    holdout_seasons = sorted(holdout_seasons)
+    max_workers = max_workers or os.cpu_count()
+
+    arrays, divisions = build_sweep_arrays(matches_df, initial_elos)
+    print(f"🔬 {len(candidates)} combinaisons, {len(matches_df)} matchs, {max_workers} processus")
+
+    started = time.perf_counter()
+    with SharedArrays(arrays) as shared:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(shared.descriptors, divisions, holdout_seasons),
+        ) as pool:
+            results = list(pool.map(_evaluate_in_worker, candidates))
+    elapsed = time.perf_counter() - started
+
+    ranking = pd.DataFrame(results).sort_values(["log_loss", "brier"], kind="stable").reset_index(drop=True)
+    print(f"✅ Recherche terminée en {elapsed:.1f}s ({len(candidates) / elapsed:.2f} replays/s)")
+    return ranking
+
+if __name__ == "__main__":
+    import sys
+    from columnar_cache import load_matches_columnar
+
+    matches_path = sys.argv[1] if len(sys.argv) > 1 else "data/Matches.csv"
+    matches_df = load_matches_columnar(matches_path)
+    seasons = season_of(matches_df["MatchDate"])
+    holdout = sorted(set(seasons.tolist()))[-2:]  # Deux dernières saisons en test
+
+    ranking = run_sweep(matches_df, holdout)
+    print(ranking.head(10).to_string(index=False))
@@ -0,0 +1,115 @@
+"""
+Estimateur lissé des probabilités par écart ELO (noyau d'Epanechnikov)
+
+Au lieu des tranches fixes de ±25 points de calculate_probabilities, chaque
+match de l'historique pèse 1 - ((x - g) / h)² autour du point g. Les sommes
+pondérées sur une grille fine sont obtenues à partir de sommes cumulées de
+y, x·y et x²·y sur l'historique trié: deux searchsorted par point de grille.
+Les queues peu fournies sont ramenées vers les fréquences globales.
+
+Une requête est ensuite une simple interpolation sur la grille; la grille se
+sauvegarde en .npz, le serveur n'a donc pas besoin de l'historique.
+"""
+
+import numpy as np
+
+GRID_PATH = "data/probability_grid.npz"
+
+# Issues lissées: 1/X/2, plus de 2.5 buts, les deux équipes marquent
+OUTCOMES = ("home_win", "draw", "away_win", "over_2_5", "btts_yes")
+
+class KernelProbabilityGrid:
+    def __init__(self, grid, probabilities, effective_matches, bandwidth):
+        self.grid = grid
+        self.probabilities = probabilities  # (len(grid), len(OUTCOMES))
+        self.effective_matches = effective_matches
+        self.bandwidth = bandwidth
+
+    @classmethod
+    def fit(cls, historical_matches_df, bandwidth=50.0, grid_step=5.0, grid_limit=800.0, prior_strength=20.0):
+        """Précalcule la grille depuis l'historique (colonnes elo_diff, FTResult, FTHome, FTAway)"""
+        elo_diff = historical_matches_df["elo_diff"].to_numpy(dtype=np.float64)
+        results = historical_matches_df["FTResult"].to_numpy()
+        home_goals = historical_matches_df["FTHome"].to_numpy(dtype=np.float64)
+        away_goals = historical_matches_df["FTAway"].to_numpy(dtype=np.float64)
+
+        valid = ~np.isnan(elo_diff)
+        order = np.argsort(elo_diff[valid], kind="stable")
+        x = elo_diff[valid][order]
+        y = np.column_stack([
+            np.ones(len(x)),  # poids total
+            results[valid][order] == "H",
+            results[valid][order] == "D",
+            results[valid][order] == "A",
+            home_goals[valid][order] + away_goals[valid][order] > 2.5,
+            (home_goals[valid][order] > 0) & (away_goals[valid][order] > 0),
+        ]).astype(np.float64)
+
+        # Sommes cumulées de y, x·y et x²·y (ligne 0 = somme vide)
+        moments = np.zeros((3, len(x) + 1, y.shape[1]), dtype=np.float64)
+        for power in range(3):
+            np.cumsum(y * (x ** power)[:, None], axis=0, out=moments[power, 1:])
+
+        grid = np.arange(-grid_limit, grid_limit + grid_step / 2, grid_step)
+        starts = np.searchsorted(x, grid - bandwidth, side="right")
+        stops = np.searchsorted(x, grid + bandwidth, side="left")
+        window = moments[:, stops] - moments[:, starts]  # (3, len(grid), n_columns)
+
+        # Σ (1 - ((x - g) / h)²)·y = S0 - (S2 - 2g·S1 + g²·S0) / h²
+        g = grid[:, None]
+        weighted = window[0] - (window[2] - 2 * g * window[1] + g ** 2 * window[0]) / bandwidth ** 2
+        weights = weighted[:, 0]
+
+        # Rétrécissement vers les fréquences globales là où le noyau voit peu de matchs
+        global_rates = y[:, 1:].mean(axis=0) if len(x) else np.full(len(OUTCOMES), np.nan)
+        probabilities = (weighted[:, 1:] + prior_strength * global_rates) / (weights + prior_strength)[:, None]
+
+        return cls(grid, probabilities, weights, bandwidth)
+
+    def query_batch(self, elo_diffs):
+        """Probabilités lissées pour un tableau d'écarts ELO (interpolation linéaire sur la grille)"""
+        elo_diffs = np.asarray(elo_diffs, dtype=np.float64)
+        values = {
+            outcome: np.interp(elo_diffs, self.grid, self.probabilities[:, i])
+            for i, outcome in enumerate(OUTCOMES)
+        }
+        home_win, draw, away_win = values["home_win"], values["draw"], values["away_win"]
+        return {
+            "effective_matches": np.interp(elo_diffs, self.grid, self.effective_matches),
+            "prob_home_win": home_win,
+            "prob_draw": draw,
+            "prob_away_win": away_win,
+            "prob_home_or_draw": home_win + draw,
+            "prob_away_or_draw": away_win + draw,
+            "prob_home_or_away": home_win + away_win,
+            "prob_over_2.5": values["over_2_5"],
+            "prob_under_2.5": 1 - values["over_2_5"],
+            "prob_btts_yes": values["btts_yes"],
+            "prob_btts_no": 1 - values["btts_yes"],
+        }
+
+    def query(self, elo_diff):
+        """Même clés que calculate_probabilities, sans jamais renvoyer None"""
+        return {key: float(values[0]) for key, values in self.query_batch([elo_diff]).items()}
+
+    def match_probabilities(self, elo_diff):
+        """Format de EfficientDataManager.calculate_match_probabilities (home_win, over_2_5...)"""
+        probs = self.query(elo_diff)
+        return {
+            key[len("prob_"):].replace(".", "_"): value
+            for key, value in probs.items() if key.startswith("prob_")
+        }
+
+    def save(self, path=GRID_PATH):
+        np.savez(
+            path,
+            grid=self.grid,
+            probabilities=self.probabilities,
+            effective_matches=self.effective_matches,
+            bandwidth=np.float64(self.bandwidth),
+        )
+
+    @classmethod
+    def load(cls, path=GRID_PATH):
+        with np.load(path) as data:
+            return cls(data["grid"], data["probabilities"], data["effective_matches"], float(data["bandwidth"]))
@@ -0,0 +1,115 @@
+"""
+Compteur d'appels API quotidien, séparé du fichier des ELO
+
+Une petite table SQLite (une ligne par jour fournisseur) incrémentée de façon
+atomique: plusieurs threads ou processus peuvent compter en même temps, et le
+compteur repart à zéro tout seul au changement de jour (minuit UTC chez
+API-Football, décalable avec reset_hour_utc).
+
+Le même fichier porte le seau à jetons partagé: try_reserve vérifie le quota
+du jour et le débit, puis réserve l'appel, dans une seule transaction
+verrouillée (BEGIN IMMEDIATE) commune à tous les processus de la machine.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+LEDGER_PATH = "data/api_quota.sqlite"
+
+class QuotaLedger:
+    def __init__(self, path=LEDGER_PATH, reset_hour_utc=0):
+        self.path = path
+        self.reset_hour_utc = reset_hour_utc
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS api_calls (day TEXT PRIMARY KEY, calls INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_bucket ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+        finally:
+            connection.close()
+
+    def _connect(self):
+        # Une connexion par opération: utilisable depuis n'importe quel thread
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def current_day(self, now=None):
+        """Jour fournisseur en cours (YYYY-MM-DD)"""
+        now = now or datetime.now(timezone.utc)
+        return (now - timedelta(hours=self.reset_hour_utc)).strftime("%Y-%m-%d")
+
+    def seconds_until_reset(self, now=None):
+        """Secondes avant le prochain changement de jour fournisseur"""
+        now = now or datetime.now(timezone.utc)
+        shifted = now - timedelta(hours=self.reset_hour_utc)
+        next_day = shifted.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        return (next_day - shifted).total_seconds()
+
+    def seed_day(self, day, calls):
+        """Reprend un compteur existant pour `day` (migration): garde le plus grand des deux"""
+        connection = self._connect()
+        try:
+            connection.execute(
+                "INSERT INTO api_calls (day, calls) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET calls = MAX(calls, excluded.calls)",
+                (day, int(calls)),
+            )
+        finally:
+            connection.close()
+
+    def calls_today(self):
+        """Nombre d'appels du jour en cours (0 après le changement de jour)"""
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT calls FROM api_calls WHERE day = ?", (self.current_day(),)).fetchone()
+            return row[0] if row else 0
+        finally:
+            connection.close()
+
+    def try_reserve(self, max_daily_calls, rate_per_second, burst=1):
+        """
+        Réserve un appel si le quota du jour et le seau à jetons le permettent.
+        Retourne (True, 0.0) si réservé, (False, attente en secondes) si le débit est atteint,
+        (False, None) si le quota du jour est épuisé.
+        """
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            day = self.current_day()
+            row = connection.execute("SELECT calls FROM api_calls WHERE day = ?", (day,)).fetchone()
+            if (row[0] if row else 0) >= max_daily_calls:
+                connection.execute("COMMIT")
+                return False, None
+
+            now = time.time()
+            bucket = connection.execute("SELECT tokens, updated FROM rate_bucket WHERE id = 0").fetchone()
+            tokens, updated = bucket if bucket else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate_per_second) if rate_per_second else burst
+            if tokens < 1:
+                connection.execute("COMMIT")
+                return False, (1 - tokens) / rate_per_second
+
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_bucket (id, tokens, updated) VALUES (0, ?, ?)", (tokens - 1, now)
+            )
+            connection.execute(
+                "INSERT INTO api_calls (day, calls) VALUES (?, 1) "
+                "ON CONFLICT(day) DO UPDATE SET calls = calls + 1",
+                (day,),
+            )
+            connection.execute("COMMIT")
+            return True, 0.0
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
@@ -0,0 +1,76 @@
+"""
+Limiteur de débit et garde de quota partagés entre processus
+
+Le job GitHub Actions, le script quotidien et chaque worker du serveur
+passent par le même seau à jetons et le même compteur quotidien, stockés
+dans le fichier SQLite du QuotaLedger. Selon la politique, un appelant
+bloque jusqu'au prochain jeton ("block") ou échoue immédiatement
+("fail_fast"); un quota épuisé échoue toujours.
+"""
+
+import threading
+import time
+
+class RateLimited(Exception):
+    """Débit maximal atteint (politique fail_fast, ou attente plus longue que max_wait)"""
+
+class QuotaExceeded(Exception):
+    """Quota quotidien de l'API épuisé"""
+
+class SharedRateLimiter:
+    def __init__(self, quota_ledger, rate_per_second, max_daily_calls, burst=None,
+                 policy="block", max_wait=60.0):
+        if policy not in ("block", "fail_fast"):
+            raise ValueError(f"Politique inconnue: {policy}")
+        self.quota_ledger = quota_ledger
+        self.rate_per_second = rate_per_second
+        self.max_daily_calls = max_daily_calls
+        self.burst = burst if burst is not None else max(1, int(rate_per_second or 1))
+        self.policy = policy
+        self.max_wait = max_wait
+
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "acquired": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "rejected_rate": 0, "rejected_quota": 0,
+        }
+
+    def acquire(self, endpoint=None):
+        """Réserve un appel (jeton + quota du jour); retourne le temps d'attente en secondes"""
+        started = time.monotonic()
+        slept = False
+        while True:
+            reserved, wait = self.quota_ledger.try_reserve(self.max_daily_calls, self.rate_per_second, self.burst)
+            waited = time.monotonic() - started
+            if reserved:
+                self._record(waited, slept)
+                return waited
+            if wait is None:
+                self._reject("rejected_quota")
+                raise QuotaExceeded(f"Quota quotidien atteint ({self.max_daily_calls} appels)")
+            if self.policy == "fail_fast" or waited + wait > self.max_wait:
+                self._reject("rejected_rate")
+                raise RateLimited(f"Débit maximal atteint ({self.rate_per_second}/s) pour {endpoint or 'API'}")
+            time.sleep(wait)
+            slept = True
+
+    def _record(self, waited, slept):
+        # "waited": appels retardés par le débit (la transaction SQLite seule ne compte pas)
+        with self._metrics_lock:
+            self.metrics["acquired"] += 1
+            if slept:
+                self.metrics["waited"] += 1
+            self.metrics["wait_seconds"] += waited
+            self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], waited)
+
+    def _reject(self, counter):
+        with self._metrics_lock:
+            self.metrics[counter] += 1
+
+    def stats(self):
+        """Métriques d'attente de ce processus (le quota est partagé, les métriques non)"""
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        metrics["avg_wait_seconds"] = metrics["wait_seconds"] / metrics["acquired"] if metrics["acquired"] else 0.0
+        metrics["policy"] = self.policy
+        return metrics
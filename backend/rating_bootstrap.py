@@ -0,0 +1,55 @@
+"""
+ELO de départ des équipes depuis EloRatings.csv, à la date de leur premier match
+
+EloRatings.csv est trié une fois par date puis joint "as-of" (merge_asof,
+direction backward) aux premières apparitions des équipes dans Matches.csv:
+chaque équipe reçoit le dernier rating publié avant son premier match. Sans
+rating antérieur, on prend le plus ancien rating connu du club, puis l'ELO
+par défaut. Le tout est en O(N log N), quelle que soit la date de départ.
+"""
+
+import numpy as np
+import pandas as pd
+
+from team_registry import DEFAULT_ELO
+
+def first_appearances(matches_df, date_column="MatchDate"):
+    """Date du premier match de chaque équipe (domicile ou extérieur), triée par date"""
+    appearances = pd.DataFrame({
+        "team": np.concatenate([
+            matches_df["HomeTeam"].astype(object).to_numpy(),
+            matches_df["AwayTeam"].astype(object).to_numpy(),
+        ]),
+        "date": np.tile(pd.to_datetime(matches_df[date_column]).to_numpy(), 2),
+    }).dropna(subset=["team"])
+    first = appearances.groupby("team", sort=False)["date"].min().reset_index()
+    return first.sort_values("date", kind="stable").reset_index(drop=True)
+
+def index_elo_ratings(elo_df):
+    """Ratings valides triés par (date, club), prêts pour merge_asof"""
+    ratings = pd.DataFrame({
+        "club": elo_df["club"].astype(object).to_numpy(),
+        "rating_date": pd.to_datetime(elo_df["date"]).to_numpy(),
+        "elo": elo_df["elo"].to_numpy(dtype=np.float64),
+    }).dropna()
+    return ratings.sort_values(["rating_date", "club"], kind="stable").reset_index(drop=True)
+
+def bootstrap_ratings(matches_df, elo_df, default_elo=DEFAULT_ELO, date_column="MatchDate"):
+    """
+    {équipe: ELO} pour toutes les équipes de matches_df, au jour de leur premier match:
+    dernier rating publié à cette date, sinon le plus ancien du club, sinon default_elo.
+    """
+    first = first_appearances(matches_df, date_column)
+    ratings = index_elo_ratings(elo_df)
+
+    # Équipes sans date de premier match valide: pas de jointure temporelle possible
+    dated = first.dropna(subset=["date"])
+    joined = pd.merge_asof(
+        dated, ratings, left_on="date", right_on="rating_date",
+        left_by="team", right_by="club", direction="backward",
+    )
+    elos = pd.Series(joined["elo"].to_numpy(), index=joined["team"].to_numpy()).reindex(first["team"])
+
+    earliest = ratings.drop_duplicates("club", keep="first").set_index("club")["elo"]
+    elos = elos.fillna(earliest.reindex(elos.index)).fillna(default_elo)
+    return dict(zip(elos.index, elos.to_numpy(dtype=np.float64).tolist()))
@@ -0,0 +1,132 @@
+"""
+Index temporel des ELO: rating de n'importe quelle équipe à n'importe quelle date
+
+Construit à partir d'un replay (replay_history / incremental_replay): pour
+chaque équipe, les dates de ses matchs et son ELO après chacun, triés et
+stockés à plat (une tranche par équipe, format CSR). "ELO de X au jour D" est
+une recherche dichotomique dans la tranche de X; "ELO de toutes les équipes
+au jour D" est un seul searchsorted vectorisé. Sauvegardable en .npz pour ne
+jamais rejouer l'historique.
+"""
+
+import numpy as np
+import pandas as pd
+
+from team_registry import TeamRegistry
+
+TIMELINE_PATH = "data/rating_timeline.npz"
+
+NAT_DAY = np.iinfo(np.int64).min  # datetime64("NaT") vu comme un nombre de jours
+
+def _to_days(dates):
+    """Jours depuis l'epoch (int64); une date manquante donne NAT_DAY"""
+    return np.asarray(pd.to_datetime(dates).values.astype("datetime64[D]").astype(np.int64))
+
+def _query_day(date):
+    day = int(_to_days([date])[0])
+    if day == NAT_DAY:
+        raise ValueError(f"Date invalide pour une requête ELO: {date!r}")
+    return day
+
+class RatingTimeline:
+    def __init__(self, registry, offsets, days, ratings, initial_ratings, default_elo=1500):
+        self.registry = registry
+        self.offsets = offsets  # tranche de l'équipe t: [offsets[t], offsets[t + 1])
+        self.days = days  # jours depuis l'epoch, triés à l'intérieur de chaque tranche
+        self.ratings = ratings  # ELO après le match correspondant
+        self.initial_ratings = initial_ratings  # ELO avant le premier match de chaque équipe
+        self.default_elo = default_elo
+
+        # Clé composite (équipe, jour) croissante sur tout le tableau, pour les requêtes vectorisées
+        self.min_day = int(days.min()) if len(days) else 0
+        self.span = int(days.max()) - self.min_day + 2 if len(days) else 1
+        team_of_event = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        self.keys = team_of_event * self.span + (days - self.min_day)
+
+    @classmethod
+    def from_replay(cls, replay, dates, default_elo=1500):
+        """Construit l'index depuis le résultat d'un replay et les dates des matchs (même ordre)"""
+        registry = replay["registry"]
+        n_teams = len(registry)
+        home_ids = np.asarray(replay["home_ids"], dtype=np.int64)
+        away_ids = np.asarray(replay["away_ids"], dtype=np.int64)
+        match_days = _to_days(dates)
+
+        # Un événement par équipe et par match, entrelacés dans l'ordre des matchs
+        teams = np.column_stack([home_ids, away_ids]).ravel()
+        days = np.repeat(match_days, 2)
+        ratings = np.column_stack([replay["home_elo_after"], replay["away_elo_after"]]).ravel()
+        before = np.column_stack([replay["home_elo_before"], replay["away_elo_before"]]).ravel()
+
+        # Matchs sans équipe ou sans date (gardés en fin de fichier par le cache colonnaire): pas de point daté
+        valid = (teams >= 0) & (days != NAT_DAY)
+        teams, days, ratings, before = teams[valid], days[valid], ratings[valid], before[valid]
+
+        # Tri stable par (équipe, jour): l'ordre des matchs d'un même jour est conservé
+        order = np.lexsort((days, teams))
+        teams, days, ratings, before = teams[order], days[order], ratings[order], before[order]
+        offsets = np.zeros(n_teams + 1, dtype=np.int64)
+        np.cumsum(np.bincount(teams, minlength=n_teams), out=offsets[1:])
+
+        initial_ratings = np.full(n_teams, default_elo, dtype=np.float64)
+        has_matches = offsets[1:] > offsets[:-1]
+        initial_ratings[has_matches] = before[offsets[:-1][has_matches]]
+
+        return cls(registry, offsets, days, ratings, initial_ratings, default_elo)
+
+    def rating_as_of(self, team, date):
+        """ELO de l'équipe après tous ses matchs joués jusqu'au jour `date` inclus (ValueError si date manquante)"""
+        day = _query_day(date)
+        team_id = self.registry.lookup(team)
+        if team_id < 0:
+            return None
+        start, stop = self.offsets[team_id], self.offsets[team_id + 1]
+        position = start + np.searchsorted(self.days[start:stop], day, side="right")
+        if position == start:
+            return float(self.initial_ratings[team_id])
+        return float(self.ratings[position - 1])
+
+    def ratings_as_of(self, date):
+        """ELO de toutes les équipes au jour `date` (tableau indexé par ID d'équipe; ValueError si date manquante)"""
+        day = _query_day(date)
+        n_teams = len(self.offsets) - 1
+        team_ids = np.arange(n_teams, dtype=np.int64)
+        clipped = min(max(day - self.min_day, -1), self.span - 1)
+        positions = np.searchsorted(self.keys, team_ids * self.span + clipped, side="right")
+        has_rating = positions > self.offsets[:-1]
+        return np.where(has_rating, self.ratings[np.maximum(positions - 1, 0)], self.initial_ratings)
+
+    def ratings_as_of_dict(self, date):
+        """{nom: ELO} au jour `date`"""
+        return dict(zip(self.registry.names, self.ratings_as_of(date).tolist()))
+
+    def series(self, team):
+        """Historique d'une équipe: (dates, ELO après chaque match)"""
+        team_id = self.registry.lookup(team)
+        if team_id < 0:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        start, stop = self.offsets[team_id], self.offsets[team_id + 1]
+        return self.days[start:stop].astype("datetime64[D]"), self.ratings[start:stop]
+
+    def save(self, path=TIMELINE_PATH):
+        np.savez(
+            path,
+            teams=np.asarray(self.registry.names, dtype=np.str_),
+            offsets=self.offsets,
+            days=self.days,
+            ratings=self.ratings,
+            initial_ratings=self.initial_ratings,
+            default_elo=np.float64(self.default_elo),
+        )
+
+    @classmethod
+    def load(cls, path=TIMELINE_PATH):
+        with np.load(path) as data:
+            return cls(
+                TeamRegistry(data["teams"].tolist()),
+                data["offsets"],
+                data["days"],
+                data["ratings"],
+                data["initial_ratings"],
+                float(data["default_elo"]),
+            )
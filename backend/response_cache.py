@@ -0,0 +1,171 @@
+"""
+Cache des réponses de l'API: LRU en mémoire devant un stockage SQLite
+
+Les clés sont le SHA-256 de (endpoint, paramètres triés): plus de noms de
+fichiers contenant des accolades et des guillemets. Chaque endpoint a sa
+durée de vie (TTL). Le stockage sur disque est plafonné en taille: les
+entrées expirées sont supprimées d'abord, puis les moins récemment lues.
+Les compteurs de hits/misses sont exposés par stats().
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CACHE_PATH = "data/cache/responses.sqlite"
+
+# Durée de vie par endpoint (secondes); les autres utilisent default_ttl
+ENDPOINT_TTLS = {
+    "fixtures": 1800,
+    "standings": 6 * 3600,
+    "teams": 7 * 86400,
+    "leagues": 7 * 86400,
+}
+
+def cache_key(endpoint, params=None):
+    """Clé stable: SHA-256 de l'endpoint et des paramètres triés"""
+    canonical = json.dumps([endpoint, params or {}], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, default_ttl=1800, endpoint_ttls=None,
+                 memory_entries=256, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.endpoint_ttls = dict(ENDPOINT_TTLS if endpoint_ttls is None else endpoint_ttls)
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # clé -> (expiration, données)
+        self._lock = threading.RLock()  # protège le LRU mémoire et les compteurs (partagés entre threads)
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, expires REAL NOT NULL, "
+                "last_access REAL NOT NULL, size INTEGER NOT NULL, payload BLOB NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte: commit en sortie de bloc, puis fermeture"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def ttl_for(self, endpoint):
+        return self.endpoint_ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint, params=None, record=True):
+        """Réponse en cache encore valide, ou None (record=False: sans toucher aux compteurs)"""
+        key = cache_key(endpoint, params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, data = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self._count("memory_hits", record)
+                    return data
+                del self._memory[key]
+
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT expires, payload FROM responses WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self._count("misses", record)
+                return None
+            connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+
+        expires, payload = row
+        data = json.loads(payload)
+        self._remember(key, expires, data)
+        self._count("disk_hits", record)
+        return data
+
+    def _count(self, counter, record=True, amount=1):
+        if record:
+            with self._lock:
+                self.counters[counter] += amount
+
+    def set(self, endpoint, params, data):
+        """Enregistre une réponse avec le TTL de son endpoint"""
+        key = cache_key(endpoint, params)
+        now = time.time()
+        expires = now + self.ttl_for(endpoint)
+        payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, expires, last_access, size, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, expires, now, len(payload), payload),
+            )
+            self._evict(connection, now)
+        self._remember(key, expires, data)
+        self._count("writes")
+
+    def _remember(self, key, expires, data):
+        with self._lock:
+            self._memory[key] = (expires, data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self, connection, now):
+        """Supprime les entrées expirées, puis les moins récemment lues au-delà de max_bytes"""
+        evicted = connection.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            rows = connection.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+            stale_keys = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale_keys.append((key,))
+                total -= size
+            connection.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+            with self._lock:
+                for (key,) in stale_keys:
+                    self._memory.pop(key, None)
+            evicted += len(stale_keys)
+        self._count("evictions", amount=evicted)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Compteurs hits/misses, taux de hit et taille du stockage"""
+        with self._connect() as connection:
+            entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            counters = dict(self.counters)
+            memory_entries = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "disk_entries": entries,
+            "disk_bytes": size,
+        }
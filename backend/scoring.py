@@ -0,0 +1,53 @@
+"""
+Métriques de qualité des probabilités prédites (Brier, log-loss)
+"""
+
+import numpy as np
+
+RESULT_CODES = {"H": 0, "D": 1, "A": 2}
+EPSILON = 1e-15
+
+def encode_results(results):
+    """FTResult ('H'/'D'/'A') -> codes 0/1/2, -1 si inconnu"""
+    results = np.asarray(results, dtype=object)
+    codes = np.full(len(results), -1, dtype=np.int8)
+    for result, code in RESULT_CODES.items():
+        codes[results == result] = code
+    return codes
+
+def one_hot(codes, n_classes=3):
+    """Codes entiers -> matrice indicatrice (n, n_classes)"""
+    return np.eye(n_classes, dtype=np.float64)[np.asarray(codes)]
+
+def brier_score(probabilities, outcomes):
+    """Score de Brier multi-classes: moyenne de la somme des écarts au carré"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    if probabilities.ndim == 1:
+        return float(np.mean((probabilities - outcomes) ** 2))
+    return float(np.mean(np.sum((probabilities - outcomes) ** 2, axis=1)))
+
+def log_loss(probabilities, outcomes):
+    """Log-loss moyenne (probabilités bornées pour éviter log(0))"""
+    probabilities = np.clip(np.asarray(probabilities, dtype=np.float64), EPSILON, 1 - EPSILON)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    if probabilities.ndim == 1:
+        return float(-np.mean(outcomes * np.log(probabilities) + (1 - outcomes) * np.log(1 - probabilities)))
+    return float(-np.mean(np.sum(outcomes * np.log(probabilities), axis=1)))
+
+def calibration_curve(probabilities, outcomes, n_bins=10):
+    """Courbe de calibration d'un événement binaire: par tranche de probabilité prédite,
+    probabilité moyenne prédite, fréquence observée et nombre de matchs"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    bins = np.minimum((probabilities * n_bins).astype(np.int64), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_predicted = np.bincount(bins, weights=probabilities, minlength=n_bins) / counts
+        observed = np.bincount(bins, weights=outcomes, minlength=n_bins) / counts
+    return {
+        "bin_edges": np.linspace(0, 1, n_bins + 1),
+        "mean_predicted": mean_predicted,
+        "observed": observed,
+        "count": counts,
+    }
@@ -0,0 +1,156 @@
+"""
+Benchmark de la récupération des matchs contre le serveur local StandInServer
+
+Mesure, sans réseau ni quota: récupération à froid, relecture depuis le
+cache, rafale d'appels concurrents identiques (single-flight), et le
+comportement sous erreurs/429 simulés. Les réponses viennent d'enregistrements
+(--recordings) ou sont générées (--synthetic-leagues).
+
+Enregistrer de vraies réponses (consomme du quota):
+    RAPIDAPI_KEY=... python scripts/benchmark_ingestion.py --record 2025-03-01 2025-03-02
+Benchmark:
+    python scripts/benchmark_ingestion.py --dates 2025-03-01 --latency 0.2 --error-rate 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Ajouter le répertoire parent au PYTHONPATH pour les imports relatifs
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from api_standin import (RECORDINGS_DIR, FixtureRecorder, StandInServer, load_recordings, recording_key,
+                         synthetic_fixtures)
+from api_transport import ApiTransport
+from efficient_data_manager import DEFAULT_BASE_URL, EfficientDataManager
+
+def record(dates, recordings_dir):
+    """Capture les réponses réelles des dates demandées"""
+    api_key = os.environ.get("RAPIDAPI_KEY")
+    if not api_key:
+        sys.exit("❌ RAPIDAPI_KEY manquante pour l'enregistrement")
+    transport = ApiTransport(DEFAULT_BASE_URL, {
+        "X-RapidAPI-Key": api_key,
+        "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
+    })
+    recorder = FixtureRecorder(transport, recordings_dir)
+    for date in dates:
+        pages = recorder.record_date(date)
+        print(f"💾 {date}: {pages} page(s) enregistrée(s) dans {recordings_dir}")
+
+def timed(function, *args, quiet=True):
+    """(résultat, secondes); sortie du manager masquée sauf en mode verbeux"""
+    output = io.StringIO() if quiet else sys.stdout
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        result = function(*args)
+    return result, time.perf_counter() - started
+
+def run_benchmark(args, recordings):
+    quiet = not args.verbose
+    server = StandInServer(
+        recordings, latency=args.latency, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    report = {}
+
+    # Dossier de travail jetable: caches, quota et fichiers fixtures isolés de data/
+    with server, tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        leagues = range(1, args.leagues + 1) if args.leagues else []
+        manager, _ = timed(lambda: EfficientDataManager(
+            "standin", base_url=server.url, priority_leagues=leagues,
+            max_concurrency=args.concurrency, requests_per_second=args.rate,
+        ), quiet=quiet)
+        manager.transport.backoff_base = args.backoff_base
+
+        # 1. À froid: chaque date passe par l'API locale
+        cold = []
+        for date in args.dates:
+            before = server.counters["requests"]
+            fixtures, seconds = timed(manager.get_today_fixtures_smart, date, quiet=quiet)
+            cold.append({"date": date, "fixtures": len(fixtures), "seconds": seconds,
+                         "requests": server.counters["requests"] - before})
+        report["cold"] = cold
+
+        # 2. À chaud: fichiers fixtures_{date}.json
+        before = server.counters["requests"]
+        _, seconds = timed(lambda: [manager.get_today_fixtures_smart(date) for date in args.dates], quiet=quiet)
+        report["warm"] = {"seconds": seconds, "requests": server.counters["requests"] - before}
+
+        # 3. Rafale concurrente sur une date jamais vue: une seule requête attendue par page
+        burst_date = "2099-01-01"
+        before = server.counters["requests"]
+        threads = [threading.Thread(target=manager.make_api_call, args=("fixtures", {"date": burst_date}))
+                   for _ in range(args.burst)]
+        _, seconds = timed(lambda: ([t.start() for t in threads], [t.join() for t in threads]), quiet=quiet)
+        report["burst"] = {"callers": args.burst, "seconds": seconds, "requests": server.counters["requests"] - before}
+
+        report["server"] = dict(server.counters)
+        report["manager"] = manager.get_api_usage_stats()
+        os.chdir(BACKEND_DIR)
+    return report
+
+def print_report(report):
+    print("\n🧪 Benchmark ingestion (serveur local)")
+    for run in report["cold"]:
+        rate = run["fixtures"] / run["seconds"] if run["seconds"] > 0 else float("inf")
+        print(f"   ❄️  {run['date']}: {run['fixtures']} matchs en {run['seconds']:.3f}s "
+              f"({run['requests']} requêtes, {rate:,.0f} matchs/s)")
+    print(f"   🔥 Relecture cache: {report['warm']['seconds'] * 1000:.1f} ms, {report['warm']['requests']} requêtes")
+    burst = report["burst"]
+    print(f"   👥 Rafale: {burst['callers']} appelants, {burst['requests']} requête(s), {burst['seconds']:.3f}s")
+    print(f"   🖥️  Serveur: {report['server']}")
+    manager = report["manager"]
+    print(f"   📦 Cache: hit rate {manager['cache']['hit_rate']:.1%}, {manager['cache']['disk_entries']} entrées")
+    print(f"   ⏳ Limiteur: attente moyenne {manager['rate_limiter']['avg_wait_seconds'] * 1000:.1f} ms")
+    for endpoint, stats in manager["latency"].items():
+        print(f"   ⏱️  {endpoint}: p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+              f"{stats['retries']} retries, {stats['throttled']} x 429")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de récupération des matchs hors réseau")
+    parser.add_argument("--record", nargs="+", metavar="DATE", help="enregistrer ces dates depuis la vraie API")
+    parser.add_argument("--recordings", default=os.path.join(BACKEND_DIR, RECORDINGS_DIR))
+    parser.add_argument("--dates", nargs="+", default=["2025-03-01"])
+    parser.add_argument("--synthetic-leagues", type=int, default=50,
+                        help="ligues générées pour les dates sans enregistrement")
+    parser.add_argument("--leagues", type=int, default=30, help="ligues suivies (0 = toutes)")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--latency-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=50, help="requêtes par seconde autorisées")
+    parser.add_argument("--burst", type=int, default=20, help="appelants simultanés pour le test single-flight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="rapport complet en JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.recordings)
+        return
+
+    recordings = load_recordings(args.recordings) if os.path.isdir(args.recordings) else {}
+    for date in args.dates:
+        if recording_key("fixtures", {"date": date}) not in recordings:
+            recordings.update(synthetic_fixtures(date, n_leagues=args.synthetic_leagues))
+
+    report = run_benchmark(args, recordings)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from efficient_data_manager import EfficientDataManager
 from team_name_mapping import TeamNameMapper
 from elo_predictor import calculate_probabilities
+from probability_grid import GRID_PATH, KernelProbabilityGrid
 
 # Configuration des logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Grille de probabilités lissées (precalculée par elo_predictor), si disponible
+# Chemin relatif au dossier backend, quel que soit le répertoire de lancement
+GRID_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), GRID_PATH)
+probability_grid = KernelProbabilityGrid.load(GRID_FILE) if os.path.exists(GRID_FILE) else None
+
 def determine_best_bet(probs):
     """Détermine le meilleur pari basé sur les probabilités"""
     bets = {
@@ -41,7 +47,11 @@ def calculate_match_predictions(match):
         away_elo = match["away_elo"]
         elo_diff = home_elo - away_elo
         
-        probs = calculate_probabilities(elo_diff)
+        # Grille lissée précalculée si disponible (pas d'historique en mémoire)
+        if probability_grid is not None:
+            probs = probability_grid.match_probabilities(elo_diff)
+        else:
+            probs = calculate_probabilities(elo_diff)
         best_bet = determine_best_bet(probs)
         
         return {
@@ -132,8 +142,8 @@ def main():
         if today_matches:
             for match in today_matches:
                 # Assurez-vous que les ELO sont à jour pour les équipes du match
-                home_team_elo = data_manager.current_elos.get(team_mapper.map_team_name(match["home_team"]), 1500)
-                away_team_elo = data_manager.current_elos.get(team_mapper.map_team_name(match["away_team"]), 1500)
+                home_team_elo = data_manager.ratings.get(team_mapper.map_team_name(match["home_team"]), 1500)
+                away_team_elo = data_manager.ratings.get(team_mapper.map_team_name(match["away_team"]), 1500)
                 match["home_elo"] = home_team_elo
                 match["away_elo"] = away_team_elo
                 match["elo_diff"] = home_team_elo - away_team_elo
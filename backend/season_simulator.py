@@ -0,0 +1,137 @@
+"""
+Simulation Monte Carlo de fin de saison (titre, places européennes, relégation)
+
+Toutes les saisons simulées avancent ensemble: pour chaque match restant, le
+résultat est tiré en une fois pour les n simulations (tableaux NumPy), puis
+les ELO de chaque simulation sont mis à jour avec la même formule que
+calculate_elo_change. Les simulations peuvent être réparties sur un pool de
+processus; les graines dérivent d'une SeedSequence, le résultat est donc
+reproductible quel que soit le découpage.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from elo_predictor import get_k_factors, league_weight_table
+from team_registry import DEFAULT_ELO
+
+# Taux de nul utilisé quand aucun modèle de probabilités n'est fourni
+DEFAULT_DRAW_RATE = 0.26
+
+def elo_outcome_probabilities(elo_diff, home_advantage=100, draw_rate=DEFAULT_DRAW_RATE):
+    """Probabilités (domicile, nul, extérieur) depuis le score attendu ELO et un taux de nul fixe"""
+    expected_home = 1 / (1 + 10 ** (-(elo_diff + home_advantage) / 400))
+    draw = np.minimum(draw_rate, 2 * np.minimum(expected_home, 1 - expected_home))
+    home_win = expected_home - draw / 2
+    return home_win, draw, 1 - home_win - draw
+
+class GridOutcomeProbabilities:
+    """Adapte une KernelProbabilityGrid au simulateur (picklable, utilisable dans le pool)"""
+
+    def __init__(self, probability_grid):
+        self.probability_grid = probability_grid
+
+    def __call__(self, elo_diff, home_advantage=100):
+        probs = self.probability_grid.query_batch(elo_diff)
+        return probs["prob_home_win"], probs["prob_draw"], probs["prob_away_win"]
+
+def simulate_block(teams, ratings, points, fixtures_home, fixtures_away, n_simulations, seed,
+                   division=None, home_advantage=100, outcome_probabilities=None):
+    """
+    Simule n_simulations fins de saison; retourne les positions finales (n_simulations, n_teams).
+    fixtures_home / fixtures_away: indices des équipes dans `teams`, dans l'ordre chronologique.
+    """
+    rng = np.random.default_rng(seed)
+    outcome_probabilities = outcome_probabilities or elo_outcome_probabilities
+    n_teams = len(teams)
+
+    elos = np.tile(np.asarray(ratings, dtype=np.float64), (n_simulations, 1))
+    table = np.tile(np.asarray(points, dtype=np.float64), (n_simulations, 1))
+
+    # Score inconnu à l'avance: K du championnat avec un écart d'un but et une forme neutre (5, 5)
+    weight_table = league_weight_table([division])
+    K_factor = float(get_k_factors(np.zeros(1, dtype=np.intp), [1], [5], [5], weight_table)[0])
+
+    for home, away in zip(fixtures_home, fixtures_away):
+        elo_home = elos[:, home]
+        elo_away = elos[:, away]
+        p_home, p_draw, _ = outcome_probabilities(elo_home - elo_away, home_advantage)
+
+        draws = rng.random(n_simulations)
+        home_wins = draws < p_home
+        is_draw = ~home_wins & (draws < p_home + p_draw)
+        S_home = np.where(home_wins, 1.0, np.where(is_draw, 0.5, 0.0))
+
+        table[:, home] += np.where(home_wins, 3, np.where(is_draw, 1, 0))
+        table[:, away] += np.where(S_home == 0.0, 3, np.where(is_draw, 1, 0))
+
+        # Même mise à jour que calculate_elo_change, sur toutes les simulations
+        elo_home_adjusted = elo_home + home_advantage
+        expected_home = 1 / (1 + 10 ** ((elo_away - elo_home_adjusted) / 400))
+        expected_away = 1 / (1 + 10 ** ((elo_home_adjusted - elo_away) / 400))
+        elos[:, home] = elo_home + K_factor * (S_home - expected_home)
+        elos[:, away] = elo_away + K_factor * ((1 - S_home) - expected_away)
+
+    # Classement: points, départage aléatoire (pas de différence de buts simulée)
+    tie_break = rng.random((n_simulations, n_teams))
+    order = np.lexsort((tie_break, -table), axis=1)
+    positions = np.empty(order.shape, dtype=np.int16)
+    np.put_along_axis(positions, order, np.arange(n_teams, dtype=np.int16)[None, :].repeat(n_simulations, axis=0), axis=1)
+    return positions
+
+def _simulate_block_args(args):
+    return simulate_block(*args[:-1], **args[-1])
+
+def simulate_season(current_elos, standings, remaining_fixtures, n_simulations=100_000, seed=0,
+                    division=None, european_places=4, relegation_places=3, home_advantage=100,
+                    outcome_probabilities=None, n_workers=1, block_size=25_000):
+    """
+    Probabilités de titre, de place européenne et de relégation par équipe.
+
+    current_elos: {équipe: ELO}; standings: {équipe: points actuels};
+    remaining_fixtures: [(domicile, extérieur), ...] dans l'ordre chronologique.
+    """
+    teams = sorted(set(standings) | {team for fixture in remaining_fixtures for team in fixture})
+    team_index = {team: i for i, team in enumerate(teams)}
+    n_teams = len(teams)
+
+    ratings = np.array([current_elos.get(team, DEFAULT_ELO) for team in teams], dtype=np.float64)
+    points = np.array([standings.get(team, 0) for team in teams], dtype=np.float64)
+    fixtures_home = np.array([team_index[home] for home, _ in remaining_fixtures], dtype=np.intp)
+    fixtures_away = np.array([team_index[away] for _, away in remaining_fixtures], dtype=np.intp)
+
+    # Découpage fixe en blocs, une graine par bloc: résultat indépendant du nombre de processus
+    block_sizes = [min(block_size, n_simulations - start) for start in range(0, n_simulations, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    options = {"division": division, "home_advantage": home_advantage, "outcome_probabilities": outcome_probabilities}
+    tasks = [
+        (teams, ratings, points, fixtures_home, fixtures_away, size, block_seed, options)
+        for size, block_seed in zip(block_sizes, seeds)
+    ]
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers, os.cpu_count() or 1)) as pool:
+            blocks = list(pool.map(_simulate_block_args, tasks))
+    else:
+        blocks = [_simulate_block_args(task) for task in tasks]
+
+    # Comptage des positions finales: (n_teams, n_teams), ligne = équipe, colonne = position
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    for positions in blocks:
+        for team in range(n_teams):
+            position_counts[team] += np.bincount(positions[:, team], minlength=n_teams)
+    position_probabilities = position_counts / n_simulations
+
+    return {
+        team: {
+            "elo": float(ratings[i]),
+            "points": float(points[i]),
+            "title": float(position_probabilities[i, 0]),
+            "europe": float(position_probabilities[i, :european_places].sum()),
+            "relegation": float(position_probabilities[i, n_teams - relegation_places:].sum()),
+            "expected_position": float(position_probabilities[i] @ np.arange(1, n_teams + 1)),
+        }
+        for i, team in enumerate(teams)
+    }
@@ -0,0 +1,54 @@
+"""
+Regroupement des appels identiques simultanés ("single-flight")
+
+Le premier thread qui demande une clé exécute la fonction; ceux qui arrivent
+pendant l'exécution attendent et reçoivent le même résultat (ou la même
+exception) au lieu de relancer la requête.
+"""
+
+import threading
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.executed = 0  # appels réellement exécutés
+        self.shared = 0  # appels servis par une exécution déjà en cours
+
+    def do(self, key, function):
+        """Exécute function() une seule fois pour tous les appels concurrents sur `key`"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._flights)}
@@ -18,6 +18,7 @@ import time
 from efficient_data_manager import EfficientDataManager
 from team_name_mapping import TeamNameMapper
 from elo_predictor import calculate_probabilities
+from probability_grid import GRID_PATH, KernelProbabilityGrid
 
 # Configuration
 app = Flask(__name__)
@@ -33,11 +34,23 @@ team_mapper = None
 last_update = None
 current_matches = []
 api_stats = {"daily_calls": 0, "max_calls": 35000}
+probability_grid = None
+
+def load_probability_grid(path=GRID_PATH):
+    """Charge la grille de probabilités lissées si elle a été précalculée"""
+    global probability_grid
+    if os.path.exists(path):
+        probability_grid = KernelProbabilityGrid.load(path)
+        logger.info(f"📁 Grille de probabilités chargée: {path}")
+    else:
+        logger.info("ℹ️ Pas de grille de probabilités précalculée")
 
 def init_app():
     """Initialisation de l'application"""
     global data_manager, team_mapper, last_update
     
+    load_probability_grid()
+    
     try:
         api_key = os.environ.get("RAPIDAPI_KEY")
         if not api_key:
@@ -137,7 +150,11 @@ def calculate_match_predictions(match):
         away_elo = match["away_elo"]
         elo_diff = home_elo - away_elo
         
-        probs = calculate_probabilities(elo_diff)
+        # Grille lissée précalculée si disponible (pas d'historique en mémoire)
+        if probability_grid is not None:
+            probs = probability_grid.match_probabilities(elo_diff)
+        else:
+            probs = calculate_probabilities(elo_diff)
         best_bet = determine_best_bet(probs)
         
         return {
@@ -255,7 +272,8 @@ def refresh_data():
     try:
         if data_manager:
             logger.info("🔄 Déclenchement de la mise à jour des matchs...")
-            matches = data_manager.get_today_fixtures_smart()
+            # Mise à jour demandée: données fraîches, pas de cache périmé
+            matches = data_manager.get_today_fixtures_smart(allow_stale=False)
             
             if matches:
                 for match in matches:
@@ -296,7 +314,7 @@ def update_elos_endpoint():
         if data_manager:
             logger.info("🔄 Mise à jour des ELO en cours...")
             yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-            finished_matches = data_manager.get_today_fixtures_smart(yesterday)
+            finished_matches = data_manager.get_today_fixtures_smart(yesterday, allow_stale=False)
             
             if finished_matches:
                 finished_matches = [m for m in finished_matches if m.get("finished", False)]
@@ -330,9 +348,9 @@ def update_elos_endpoint():
 
 @app.route("/api/stats")
 def get_stats():
-    """Statistiques de l'API"""
+    """Statistiques de l'API (compteurs du cache et latences lus en direct)"""
     return jsonify({
-        "api_usage": api_stats,
+        "api_usage": data_manager.get_api_usage_stats() if data_manager else api_stats,
         "last_update": last_update.isoformat() if last_update else None,
         "matches_today": len(current_matches),
         "system_status": "operational" if data_manager else "fallback"
@@ -342,12 +360,8 @@ def get_stats():
 def get_top_teams():
     """Top des équipes par ELO"""
     try:
-        if data_manager and hasattr(data_manager, "current_elos") and data_manager.current_elos:
-            sorted_teams = sorted(
-                data_manager.current_elos.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:20]
+        if data_manager and hasattr(data_manager, "ratings") and len(data_manager.ratings):
+            sorted_teams = data_manager.ratings.top(20)
             return jsonify({
                 "success": True,
                 "teams": [{"name": name, "elo": elo} for name, elo in sorted_teams],
@@ -0,0 +1,129 @@
+"""
+Identifiants entiers des équipes et stockage des ELO en tableau NumPy
+
+TeamRegistry attribue une fois pour toutes un ID int32 dense à chaque nom
+d'équipe (par ordre d'apparition). RatingStore garde les ELO dans un tableau
+float64 indexé par ces IDs: le replay, les prédictions et le classement
+travaillent sur les IDs, les noms ne sont retraduits qu'au niveau de l'API.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ELO = 1500
+
+class TeamRegistry:
+    def __init__(self, names=()):
+        self.names = []  # ID -> nom
+        self.ids = {}  # nom -> ID
+        for name in names:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def intern(self, name):
+        """ID de l'équipe, créé si le nom est nouveau"""
+        team_id = self.ids.get(name)
+        if team_id is None:
+            team_id = len(self.names)
+            self.ids[name] = team_id
+            self.names.append(name)
+        return team_id
+
+    def intern_many(self, names):
+        """IDs int32 d'un tableau de noms (les nouveaux noms sont ajoutés par ordre d'apparition, NaN -> -1)"""
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        mapping = np.array([self.intern(name) for name in uniques] + [-1], dtype=np.int32)
+        return mapping[codes]
+
+    def lookup(self, name):
+        """ID de l'équipe, ou -1 si inconnue"""
+        return self.ids.get(name, -1)
+
+    def lookup_many(self, names):
+        """IDs int32 d'un tableau de noms, -1 pour les équipes inconnues"""
+        return np.array([self.ids.get(name, -1) for name in names], dtype=np.int32)
+
+    def name(self, team_id):
+        return self.names[team_id]
+
+class RatingStore:
+    def __init__(self, registry=None, default_elo=DEFAULT_ELO):
+        self.registry = registry if registry is not None else TeamRegistry()
+        self.default_elo = default_elo
+        self.values = np.full(max(len(self.registry), 16), default_elo, dtype=np.float64)
+        self.known = np.zeros(len(self.values), dtype=bool)  # ELO réellement connu (pas la valeur par défaut)
+        self.version = 0  # incrémenté à chaque modification, pour ne sauvegarder que les changements
+
+    @classmethod
+    def from_dict(cls, elos, registry=None, default_elo=DEFAULT_ELO):
+        store = cls(registry, default_elo)
+        store.update(elos)
+        return store
+
+    def _ensure_capacity(self, size):
+        if size > len(self.values):
+            capacity = max(size, 2 * len(self.values))
+            values = np.full(capacity, self.default_elo, dtype=np.float64)
+            known = np.zeros(capacity, dtype=bool)
+            values[:len(self.values)] = self.values
+            known[:len(self.known)] = self.known
+            self.values, self.known = values, known
+
+    def __len__(self):
+        return int(np.count_nonzero(self.known))
+
+    def __contains__(self, name):
+        team_id = self.registry.lookup(name)
+        return 0 <= team_id < len(self.known) and bool(self.known[team_id])
+
+    def get(self, name, default=None):
+        """ELO d'une équipe par son nom (default_elo si inconnue)"""
+        if name not in self:
+            return self.default_elo if default is None else default
+        return float(self.values[self.registry.lookup(name)])
+
+    def get_ids(self, team_ids):
+        """ELO d'un tableau d'IDs (valeur par défaut pour -1)"""
+        team_ids = np.asarray(team_ids)
+        self._ensure_capacity(len(self.registry))
+        return np.where(team_ids >= 0, self.values[np.maximum(team_ids, 0)], self.default_elo)
+
+    def set(self, name, elo):
+        self.set_id(self.registry.intern(name), elo)
+
+    def set_id(self, team_id, elo):
+        self._ensure_capacity(team_id + 1)
+        self.values[team_id] = elo
+        self.known[team_id] = True
+        self.version += 1
+
+    def set_ids(self, team_ids, elos):
+        team_ids = np.asarray(team_ids)
+        self._ensure_capacity(len(self.registry))
+        self.values[team_ids] = elos
+        self.known[team_ids] = True
+        self.version += 1
+
+    def update(self, elos):
+        """Charge un dict {nom: ELO}"""
+        names = list(elos)
+        team_ids = self.registry.intern_many(names)
+        self.set_ids(team_ids, np.array([elos[name] for name in names], dtype=np.float64))
+
+    def to_dict(self):
+        """{nom: ELO} pour la sérialisation JSON et l'API"""
+        team_ids = np.flatnonzero(self.known[:len(self.registry)])
+        return {self.registry.names[i]: elo for i, elo in zip(team_ids.tolist(), self.values[team_ids].tolist())}
+
+    def top(self, n=20):
+        """Les n meilleures équipes: [(nom, ELO), ...] par ELO décroissant"""
+        team_ids = np.flatnonzero(self.known[:len(self.registry)])
+        if len(team_ids) > n:
+            team_ids = team_ids[np.argpartition(-self.values[team_ids], n - 1)[:n]]
+        team_ids = team_ids[np.argsort(-self.values[team_ids], kind="stable")]
+        return [(self.registry.names[i], elo) for i, elo in zip(team_ids.tolist(), self.values[team_ids].tolist())]